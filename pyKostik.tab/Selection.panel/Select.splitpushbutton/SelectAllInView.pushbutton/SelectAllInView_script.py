@@ -14,13 +14,13 @@ CAM_AND_BOX_CATS = framework.List[DB.BuiltInCategory](
 # Camera and Section Box only meaningful in 3D views.
 # In other views they are redundant.
 non_cam_and_box_filter = DB.ElementMulticategoryFilter(CAM_AND_BOX_CATS, True)
-elems_in_view = list(
+elems_in_view = (
     DB.FilteredElementCollector(doc, view_id)
     .WherePasses(non_cam_and_box_filter)
     .WhereElementIsNotElementType()
 )
 
-elems_qty = len(elems_in_view)
+elems_qty = elems_in_view.GetElementCount()
 if elems_qty > MAX_RECOMMENDED_ELEM_QTY:
     many_elems_msg = (
         'Current view contains {} elements. \n'
@@ -33,21 +33,26 @@ if elems_qty > MAX_RECOMMENDED_ELEM_QTY:
         script.exit()
 
 if doc.IsFamilyDocument is True:
-    to_select = elems_in_view
+    to_select = elems_in_view.ToElementIds()
+
+elif view.ViewType != DB.ViewType.ThreeD:
+    # ExtentElem is met only in 3D views,
+    # so there is no need to read element names in other views
+    to_select = elems_in_view.ToElementIds()
 
 else:
-    to_select = []
-    for elem in elems_in_view:
+    # collector count is the upper bound of selection size
+    to_select = framework.List[DB.ElementId](elems_qty)
+    for elem in elems_in_view.ToElements():
         if not (hasattr(elem, 'Name') and elem.Name == "ExtentElem"):
-            to_select.append(elem.Id)
-
-    if view.ViewType == DB.ViewType.ThreeD:
-        # Adding Crop Region (which is Camera for 3DView)
-        # and Section Box to selection if they are visible
-        cam_and_box_filter = DB.ElementMulticategoryFilter(CAM_AND_BOX_CATS)
-        visibility_filter = DB.VisibleInViewFilter(doc, view_id)
-        and_filter = DB.LogicalAndFilter(cam_and_box_filter, visibility_filter)
-        camera_and_box = view.GetDependentElements(and_filter)
-        to_select.extend(camera_and_box)
+            to_select.Add(elem.Id)
+
+    # Adding Crop Region (which is Camera for 3DView)
+    # and Section Box to selection if they are visible
+    cam_and_box_filter = DB.ElementMulticategoryFilter(CAM_AND_BOX_CATS)
+    visibility_filter = DB.VisibleInViewFilter(doc, view_id)
+    and_filter = DB.LogicalAndFilter(cam_and_box_filter, visibility_filter)
+    camera_and_box = view.GetDependentElements(and_filter)
+    to_select.AddRange(camera_and_box)
 
 selection = revit.get_selection().set_to(to_select)
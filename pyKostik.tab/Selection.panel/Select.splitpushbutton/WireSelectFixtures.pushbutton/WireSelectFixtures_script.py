@@ -1,5 +1,7 @@
 """Selects elements that are connected to wires."""
 
+from System.Collections.Generic import List
+
 from pyrevit import revit, DB, forms
 from Autodesk.Revit.DB import Electrical as DBE
 
@@ -100,7 +102,7 @@ class ElecElemConnectorWrap(ConnectorWrap):
 
 
 wires = []
-elements_to_select = []
+ids_to_select = List[DB.ElementId]()
 
 if not selection.is_empty:
     for elem in selection.elements:
@@ -115,7 +117,8 @@ if not wires:
 if wires:
     for wire in wires:
         wire_wrap = WireWrap(wire)
-        elements_to_select.extend(wire_wrap.connected_elems)
+        for connected_elem in wire_wrap.connected_elems:
+            ids_to_select.Add(connected_elem.Id)
 
 
-selection.set_to(elements_to_select)
+selection.set_to(ids_to_select)
@@ -1,9 +1,13 @@
 import os
+import time
 
 from pyrevit import script
 from pyrevit.versionmgr import updater
 from pyrevit.coreutils import git
 
+UPDATE_STATUS_ENV_VAR = 'PYKOSTIK_UPDATE_STATUS'
+UPDATE_STATUS_TTL = 60  # seconds
+
 
 class RemoteRepository(object):
     """Wrapper for LibGit2Sharp Remote Repository."""
@@ -90,6 +94,22 @@ def get_origin_url(remotes):
 
 
 def get_update_status(repo_info):
+    # type: (git.RepoInfo) -> str
+    """Gets update status message.
+    The status is cached for the session for a short time,
+    so repeated clicks do not query the repository every time.
+    """
+    cached_status = script.get_envvar(UPDATE_STATUS_ENV_VAR)
+    if cached_status \
+            and time.time() - cached_status[0] < UPDATE_STATUS_TTL:
+        return cached_status[1]
+
+    update_status = check_update_status(repo_info)
+    script.set_envvar(UPDATE_STATUS_ENV_VAR, (time.time(), update_status))
+    return update_status
+
+
+def check_update_status(repo_info):
     # type: (git.RepoInfo) -> str
     if updater.has_pending_updates(repo_info):
         return (
@@ -20,30 +20,6 @@ class BalloonTip(ResultItem):
     https://thebuildingcoder.typepad.com/blog/2014/03/using-balloon-tips-in-revit.html#3"""
 
     def __init__(self, tip_category, tip_title):
-        self.category = tip_category
-        self.title = tip_title
-        self.isnew = True
-
-    @property
-    def category(self):
-        return self.Category
-
-    @category.setter
-    def category(self, cat_txt):
-        self.Category = cat_txt
-
-    @property
-    def title(self):
-        return self.Title
-
-    @title.setter
-    def title(self, title_txt):
-        self.Title = title_txt
-
-    @property
-    def isnew(self):
-        return self.IsNew
-
-    @isnew.setter
-    def isnew(self, value):
-        self.IsNew = value
+        self.Category = tip_category
+        self.Title = tip_title
+        self.IsNew = True
@@ -27,8 +27,11 @@ class ElementMovingPoint(object):
 
     def get_bounding_box_center(self):
         # type: () -> DB.XYZ
-        elem_bb = self._elem.get_BoundingBox(HOST_APP.active_view)
-        return (elem_bb.Min + elem_bb.Max) / 2
+        elem_bb = self._elem.get_BoundingBox(active_view)
+        bb_min, bb_max = elem_bb.Min, elem_bb.Max
+        return DB.XYZ((bb_min.X + bb_max.X) / 2,
+                      (bb_min.Y + bb_max.Y) / 2,
+                      (bb_min.Z + bb_max.Z) / 2)
 
     def _get_loctaion_curve(self):
         # type: () -> DB.Curve
@@ -110,7 +113,7 @@ if picked_elem:
 
 if agree_to_move:
     with revit.Transaction('Move to Origin'):
-        transform = DB.XYZ.Zero - elem_moving_point
+        transform = elem_moving_point.Negate()
         DB.ElementTransformUtils.MoveElement(
             HOST_APP.doc,
             picked_elem.Id,
@@ -1,4 +1,9 @@
+from collections import defaultdict
+
+import clr
+clr.AddReference('System.Core')
 from System.Collections.Generic import List
+from System.Linq import Enumerable
 
 from pyrevit import DB, HOST_APP, revit, script, forms
 from pykostik import exceptions as pke
@@ -22,6 +27,13 @@ class LineWrap(object):
         self._line = line
         self._start = PointWrap(self._line.GetEndPoint(0))
         self._end = PointWrap(self._line.GetEndPoint(1))
+        self._direction = self._line.Direction
+        self._length = self._line.Length
+        self._dir_coords = (
+            self._direction.X,
+            self._direction.Y,
+            self._direction.Z
+        )
 
     def __str__(self):
         return '{} [{}, {}]'.format(
@@ -30,14 +42,6 @@ class LineWrap(object):
             str(self.end)
         )
 
-    def _are_numbers_close(self, a, b, rel_tol=1e-09, abs_tol=0.0):
-        # type: (float, float, float, float) -> bool
-        """A function for testing approximate equality of two numbers.
-        Same as math.isclose in Python v3.5 (and newer)
-        https://www.python.org/dev/peps/pep-0485
-        """
-        return abs(a - b) <= max(rel_tol * max(abs(a), abs(b)), abs_tol)
-
     @classmethod
     def new(cls, start, end):
         # type: (DB.XYZ, DB.XYZ) -> LineWrap
@@ -46,23 +50,16 @@ class LineWrap(object):
     def new_reversed(self):
         return self.new(self._end.xyz, self._start.xyz)
 
-    def is_connected_to(self, other):
-        # type: (LineWrap) -> bool
-        return any(
-            (self._start == other.start,
-             self._start == other.end,
-             self._end == other.start,
-             self._end == other.end)
-        )
-
-    def is_parallel_to(self, xyz):
-        # type: (DB.XYZ) -> bool
-        dot_prod = self.direction.DotProduct(xyz)
-        return self._are_numbers_close(abs(dot_prod), 1)
+    def is_vertical(self):
+        # type: () -> bool
+        """Checks whether line is parallel to axis Z.
+        Direction is a unit vector, so only its Z coordinate is checked.
+        """
+        return abs(self._dir_coords[2]) >= 1 - 1e-09
 
     @property
     def direction(self):
-        return self._line.Direction
+        return self._direction
 
     @property
     def line(self):
@@ -70,7 +67,7 @@ class LineWrap(object):
 
     @property
     def length(self):
-        return self._line.Length
+        return self._length
 
     @property
     def start(self):
@@ -85,23 +82,30 @@ class PointWrap(object):
     def __init__(self, xyz):
         # type: (DB.XYZ) -> None
         self._xyz = xyz
+        self._approx_coords = (
+            round(xyz.X, 9),
+            round(xyz.Y, 9),
+            round(xyz.Z, 9)
+        )
 
     def __str__(self):
         return str(self.approx_coords)
 
     def __eq__(self, other):
         # type: (PointWrap) -> bool
-        return self._xyz.IsAlmostEqualTo(other.xyz)
+        return self._approx_coords == other.approx_coords
 
     def __ne__(self, other):
         # type: (PointWrap) -> bool
         return not self == other
 
+    def __hash__(self):
+        return hash(self._approx_coords)
+
     @property
     def approx_coords(self):
-        return tuple(
-            round(coord, 9) for coord in (self.x, self.y, self.z)
-        )
+        # type: () -> tuple[float, float, float]
+        return self._approx_coords
 
     @property
     def x(self):
@@ -120,6 +124,39 @@ class PointWrap(object):
         return self._xyz
 
 
+class DisjointSet(object):
+    """Disjoint-set forest of integer indexes
+    with union by rank and path splitting."""
+
+    def __init__(self, size):
+        # type: (int) -> None
+        self._parent = list(range(size))
+        self._rank = [0] * size
+
+    def find(self, index):
+        # type: (int) -> int
+        """Gets root index of the set containing given index."""
+        parent = self._parent
+        while parent[index] != index:
+            parent[index], index = parent[parent[index]], parent[index]
+        return index
+
+    def union(self, index1, index2):
+        # type: (int, int) -> None
+        """Merges sets containing given indexes."""
+        root1 = self.find(index1)
+        root2 = self.find(index2)
+        if root1 == root2:
+            return
+
+        if self._rank[root1] < self._rank[root2]:
+            root1, root2 = root2, root1
+
+        self._parent[root2] = root1
+        if self._rank[root1] == self._rank[root2]:
+            self._rank[root1] += 1
+
+
 class LineGroups(object):
     """Groups of lines grouped by connectivity"""
 
@@ -131,66 +168,63 @@ class LineGroups(object):
     @classmethod
     def group_to_chain(cls, line_wraps):
         # type: (list[LineWrap]) -> list[LineWrap]
+        """Orders closed loop of lines into a chain
+            where each line starts at the end of the previous one."""
         if len(line_wraps) == 1:
             return line_wraps
 
+        endpoint_to_lines = cls._map_endpoints_to_lines(line_wraps)
+        for line_indexes in endpoint_to_lines.values():
+            if len(line_indexes) != 2:
+                raise LinesNotChainedError
+
         chain = [line_wraps[0]]
-        rest = line_wraps[1:]
-        counter = 0
-        initial_qty = len(rest)
-        while rest:
-            last_in_chain = chain[-1]
-            for reversed_index, line in enumerate(reversed(rest)):
-                if line.is_connected_to(last_in_chain):
-                    if line.start != last_in_chain.end:
-                        line = line.new_reversed()
-                    chain.append(line)
-                    actual_index = len(rest) - reversed_index - 1
-                    rest.pop(actual_index)
-                    break
-            counter += 1
-            if counter > initial_qty:
+        prev_index = 0
+        tail = line_wraps[0].end.approx_coords
+        for _ in range(len(line_wraps) - 1):
+            first_index, second_index = endpoint_to_lines[tail]
+            if first_index == prev_index:
+                next_index = second_index
+            else:
+                next_index = first_index
+
+            if next_index == 0:
+                # loop closed before all lines were chained
                 raise LinesNotChainedError
+
+            line = line_wraps[next_index]
+            if line.start.approx_coords != tail:
+                line = line.new_reversed()
+            chain.append(line)
+            prev_index = next_index
+            tail = line.end.approx_coords
         return chain
 
     def _group_by_connectivity(self):
         # type: () -> list[list[LineWrap]]
         """Groups lines by their connectivity."""
-        lines_dict = {i: v for i, v in enumerate(self._line_wraps)}
-        neighbors = self._get_neighbors(lines_dict)
-        merged = self._merge_touching_sets(neighbors)
-        return [[lines_dict[k] for k in group] for group in merged]
-
-    def _get_neighbors(self, lines_dict):
-        # type: (dict) -> list[set[dict.key]]
-        """Gets all neighbors for each curve
-            as list of sets of dictionary keys"""
-        all_neighbours = []
-        for i in lines_dict:
-            sub_neighbours = {i}
-            for j in lines_dict:
-                line = lines_dict[i]  # type: LineWrap
-                if j != i and line.is_connected_to(lines_dict[j]):
-                    sub_neighbours.add(j)
-            all_neighbours.append(sub_neighbours)
-        return all_neighbours
-
-    def _merge_touching_sets(self, sets):
-        # type: (list[set]) -> list[set]
-        """Merges sets with common elements.
-            Source: https://stackoverflow.com/a/9400562
-        """
-        new_group = []
-        while len(new_group) != len(sets):
-            new_group, sets = sets, []
-            for set1 in new_group:
-                for set2 in sets:
-                    if not set1.isdisjoint(set2):
-                        set2.update(set1)
-                        break
-                else:
-                    sets.append(set1)
-        return sets
+        disjoint_set = DisjointSet(len(self._line_wraps))
+        endpoint_to_lines = self._map_endpoints_to_lines(self._line_wraps)
+        for line_indexes in endpoint_to_lines.values():
+            first_index = line_indexes[0]
+            for other_index in line_indexes[1:]:
+                disjoint_set.union(first_index, other_index)
+
+        groups = defaultdict(list)
+        for i, line_wrap in enumerate(self._line_wraps):
+            groups[disjoint_set.find(i)].append(line_wrap)
+        return list(groups.values())
+
+    @staticmethod
+    def _map_endpoints_to_lines(line_wraps):
+        # type: (list[LineWrap]) -> dict[tuple, list[int]]
+        """Maps approximate coordinates of each endpoint
+            to indexes of the lines sharing it."""
+        endpoint_to_lines = defaultdict(list)
+        for i, line in enumerate(line_wraps):
+            endpoint_to_lines[line.start.approx_coords].append(i)
+            endpoint_to_lines[line.end.approx_coords].append(i)
+        return endpoint_to_lines
 
     @property
     def groups(self):
@@ -202,21 +236,19 @@ class ScopeBoxGeometry(object):
     def __init__(self, geometry_element):
         # type: (DB.GeometryElement) -> None
         self._geometry_elem = geometry_element
-        geom_objects = list(self._geometry_elem)
-        self._line_wraps = self._get_line_wraps(geom_objects)
+        self._line_wraps = self._get_line_wraps(self._geometry_elem)
 
         if not self._line_wraps:
             raise pke.InvalidOperationException(
                 'Scope Box Element does not have any lines'
             )
 
-    def _get_line_wraps(self, geom_objects):
-        # type: (list[DB.GeometryObject]) -> list[LineWrap]
-        line_wraps = []
-        for geom in geom_objects:
-            if isinstance(geom, DB.Line):
-                line_wraps.append(LineWrap(geom))
-        return line_wraps
+    def _get_line_wraps(self, geometry_element):
+        # type: (DB.GeometryElement) -> list[LineWrap]
+        # type check is done on .NET side,
+        # geometry element is enumerated only once
+        lines = Enumerable.OfType[DB.Line](geometry_element)
+        return [LineWrap(line) for line in lines]
 
     def get_solid(self):
         # type: () -> DB.Solid
@@ -230,7 +262,7 @@ class ScopeBoxGeometry(object):
 
     def _get_first_vertical_line_wrap(self):
         for line_wrap in self._line_wraps:
-            if line_wrap.is_parallel_to(DB.XYZ.BasisZ):
+            if line_wrap.is_vertical():
                 return line_wrap
 
     def _get_profile_loops(self):
@@ -243,10 +275,10 @@ class ScopeBoxGeometry(object):
     def _get_bottom_rectangle(self):
         bottom_lines = self._get_bottom_lines()
         chained_lines = LineGroups.group_to_chain(bottom_lines)
-        curve_loop = DB.CurveLoop()
+        curves = List[DB.Curve](len(chained_lines))
         for line_wrap in chained_lines:
-            curve_loop.Append(line_wrap.line)
-        return curve_loop
+            curves.Add(line_wrap.line)
+        return DB.CurveLoop.Create(curves)
 
     def _get_bottom_lines(self):
         horizontal_line_wraps = self._get_horizontal_line_wraps()
@@ -267,18 +299,80 @@ class ScopeBoxGeometry(object):
     def _get_horizontal_line_wraps(self):
         return [
             line for line in self._line_wraps
-            if not line.is_parallel_to(DB.XYZ.BasisZ)
+            if not line.is_vertical()
         ]
 
 
+class ParameterFinder(object):
+    """Finds parameter by name in elements or their types.
+    Remembers found definitions and type parameters,
+    so elements of the same category or type are resolved faster.
+    """
+
+    def __init__(self, doc, param_name):
+        # type: (DB.Document, str) -> None
+        self._doc = doc
+        self._param_name = param_name
+        self._definitions = {}  # type: dict[int, DB.Definition]
+        self._type_params = {}  # type: dict[int, DB.Parameter | None]
+
+    def find(self, elem):
+        # type: (DB.Element) -> DB.Parameter
+        param = self._find_instance_param(elem)
+        if param is not None:
+            return param
+
+        type_param = self._find_type_param(elem)
+        if type_param is not None:
+            return type_param
+
+        raise pke.FailedAttempt('Parameter does not exist')
+
+    def _find_instance_param(self, elem):
+        # type: (DB.Element) -> DB.Parameter | None
+        category_key = self._get_category_key(elem)
+        definition = self._definitions.get(category_key)
+        if definition is not None:
+            param = elem.get_Parameter(definition)
+            if param is not None:
+                return param
+
+        param = elem.LookupParameter(self._param_name)
+        if param is not None:
+            self._definitions[category_key] = param.Definition
+        return param
+
+    def _find_type_param(self, elem):
+        # type: (DB.Element) -> DB.Parameter | None
+        type_id = elem.GetTypeId()
+        type_key = type_id.IntegerValue
+        if type_key not in self._type_params:
+            elem_type = self._doc.GetElement(type_id)
+            if elem_type is not None:
+                type_param = elem_type.LookupParameter(self._param_name)
+            else:
+                type_param = None
+            self._type_params[type_key] = type_param
+        return self._type_params[type_key]
+
+    def _get_category_key(self, elem):
+        # type: (DB.Element) -> int | None
+        if elem.Category is not None:
+            return elem.Category.Id.IntegerValue
+
+
 class IntersectedElement(object):
     def __init__(self, element):
         # type: (DB.Element) -> None
         self._elem = element
+        self._id = element.Id
+        self._name = None
+        self._family_and_type = None
+        self._is_family_and_type_read = False
 
-    def set_param_value(self, param_name, value):
-        # type: (str, str) -> None
-        param = self._lookup_parameter(param_name)
+    def set_param_value(self, param_finder, value):
+        # type: (ParameterFinder, str) -> None
+        param = param_finder.find(self._elem)
 
         if param.StorageType != DB.StorageType.String:
             raise pke.FailedAttempt('Parameter type is not text')
@@ -287,21 +381,7 @@ class IntersectedElement(object):
         if not set_attempt:
             raise pke.FailedAttempt('Failed setting parameter value')
 
-    def _lookup_parameter(self, param_name):
-        # type: (str) -> DB.Parameter
-        param = self._elem.LookupParameter(param_name)
-        if param is not None:
-            return param
-
-        elem_type = doc.GetElement(self._elem.GetTypeId())
-        type_param = elem_type.LookupParameter(param_name)
-        if type_param is not None:
-            return type_param
-
-        raise pke.FailedAttempt('Parameter does not exist')
-
-    @property
-    def family_and_type(self):
+    def _get_family_and_type(self):
         # type: () -> str | None
         param = self._elem.get_Parameter(
             DB.BuiltInParameter.ELEM_FAMILY_AND_TYPE_PARAM
@@ -309,14 +389,25 @@ class IntersectedElement(object):
         if param is not None:
             return param.AsValueString()
 
+    @property
+    def family_and_type(self):
+        # type: () -> str | None
+        # can be None, so a flag is used to read it only once
+        if not self._is_family_and_type_read:
+            self._family_and_type = self._get_family_and_type()
+            self._is_family_and_type_read = True
+        return self._family_and_type
+
     @property
     def name(self):
         # type: () -> str
-        return self._elem.Name
+        if self._name is None:
+            self._name = self._elem.Name
+        return self._name
 
     @property
     def id(self):
-        return self._elem.Id
+        return self._id
 
 
 class Report(object):
@@ -489,16 +580,20 @@ class ScopeBoxReport(object):
     def print_succeed(self):
         self._output.print_md('### Succeed elements')
         sorted_succeed = sorted(self._succeed_elems, key=lambda x: x.name)
-        for rep_elem in sorted_succeed:
-            txt = self._get_basic_report_txt(rep_elem)
-            self._output.print_md(txt)
+        lines = [
+            self._get_basic_report_txt(rep_elem)
+            for rep_elem in sorted_succeed
+        ]
+        self._output.print_md('\n'.join(lines))
 
     def print_failed(self):
         self._output.print_md('### :warning: Failed elements')
         sorted_failed = sorted(self._failed_elems, key=lambda x: x.name)
-        for rep_elem in sorted_failed:
-            txt = self._get_basic_report_txt(rep_elem)
-            self._output.print_md(txt + ': ' + rep_elem.error_msg)
+        lines = [
+            self._get_basic_report_txt(rep_elem) + ': ' + rep_elem.error_msg
+            for rep_elem in sorted_failed
+        ]
+        self._output.print_md('\n'.join(lines))
 
     def _get_basic_report_txt(self, rep_elem):
         # type: (ElemetReport) -> str
@@ -571,24 +666,36 @@ class ScopeBoxWrap(object):
         # type: (DB.Element) -> None
         self._scope_box_elem = scope_box
         self._doc = scope_box.Document
-        self._intersec_elems = self._get_intersected_elems()
+        self._solid = None
+        self._intersec_elems = None
 
     def _get_intersected_elems(self):
-        collector = self._get_intersec_elems_collector()
-        return [IntersectedElement(elem) for elem in collector]
+        bb_intersec_filter = DB.BoundingBoxIntersectsFilter(self._get_outline())
+        bb_collector = self._get_base_collector().WherePasses(
+            bb_intersec_filter
+        )
+
+        # no need to build the solid if nothing is even near the scope box
+        if bb_collector.GetElementCount() == 0:
+            return []
 
-    def _get_intersec_elems_collector(self):
-        outline = self._get_outline()
-        solid = self._get_solid()
-        bb_intersec_filter = DB.BoundingBoxIntersectsFilter(outline)
-        solid_intersec_filter = DB.ElementIntersectsSolidFilter(solid)
+        solid_intersec_filter = DB.ElementIntersectsSolidFilter(self.solid)
+        intersec_filter = DB.LogicalAndFilter(
+            bb_intersec_filter,
+            solid_intersec_filter
+        )
+        collector = self._get_base_collector().WherePasses(intersec_filter)
+        return [IntersectedElement(elem) for elem in collector]
 
+    def _get_base_collector(self):
+        # type: () -> DB.FilteredElementCollector
+        # scope box always passes the filter of its own outline,
+        # so it is excluded to let the empty check work
         return (
             DB.FilteredElementCollector(self._doc)
+            .Excluding(List[DB.ElementId]([self._scope_box_elem.Id]))
             .WhereElementIsNotElementType()
             .WhereElementIsViewIndependent()
-            .WherePasses(bb_intersec_filter)
-            .WherePasses(solid_intersec_filter)
         )
 
     def _get_outline(self):
@@ -607,32 +714,51 @@ class ScopeBoxWrap(object):
     def name(self):
         return str(self._scope_box_elem.Name)
 
+    @property
+    def solid(self):
+        # type: () -> DB.Solid
+        if self._solid is None:
+            self._solid = self._get_solid()
+        return self._solid
+
     @property
     def intersected_elems(self):
+        # type: () -> tuple[IntersectedElement]
+        """Intersected elements collected once on first access.
+        Document is not changed between attempts to set the parameter,
+        so they are reused by all of them.
+        """
+        if self._intersec_elems is None:
+            self._intersec_elems = tuple(self._get_intersected_elems())
         return self._intersec_elems
 
 
 class FailureCatcher(DB.IFailuresPreprocessor):
+    # compared by guids, as they are hashable by value
+    FAILURE_GUIDS_TO_CANCEL = frozenset(
+        failure_id.Guid for failure_id in (
+            DB.BuiltInFailures.GroupFailures.AtomTouchedNotAllowed,
+            DB.BuiltInFailures.GroupFailures.AtomTouchedNotAllowedDelete,
+            DB.BuiltInFailures.GroupFailures
+            .AtomViolationWhenMultiPlacedInstances
+        )
+    )
+
     def __init__(self, ids_to_skip):
         # type: (list[DB.Element]) -> None
         self._ids_to_skip = ids_to_skip
 
     def PreprocessFailures(self, failuresAccessor):
         # type: (DB.FailuresAccessor) -> None
-        group_failures = DB.BuiltInFailures.GroupFailures
-        FAILURES_TO_CANCEL = [
-            group_failures.AtomTouchedNotAllowed,
-            group_failures.AtomTouchedNotAllowedDelete,
-            group_failures.AtomViolationWhenMultiPlacedInstances
-        ]
-
         failures = failuresAccessor.GetFailureMessages()
+        if not failures.Count:
+            return DB.FailureProcessingResult.Continue
 
         for failure in failures:
             failure = failure   # type: DB.FailureMessageAccessor
-            failure_id = failure.GetFailureDefinitionId()
+            failure_guid = failure.GetFailureDefinitionId().Guid
 
-            if failure_id in FAILURES_TO_CANCEL:
+            if failure_guid in self.FAILURE_GUIDS_TO_CANCEL:
                 self._ids_to_skip.extend(failure.GetFailingElementIds())
 
         if self._ids_to_skip:
@@ -673,10 +799,12 @@ class FailureCatchingTransaction():
                              'Rolling back changes. | %s', errmsg)
 
 
-def set_param_and_prepare_report(scope_boxes, param_name, ids_to_skip=[]):
-    # type: (list[ScopeBoxWrap], str, list[DB.ElementId]) -> Report
+def set_param_and_prepare_report(scope_boxes, param_name, ids_to_skip=()):
+    # type: (list[ScopeBoxWrap], str, Iterable[DB.ElementId]) -> Report
     report = Report(param_name)
-    past_intersec_elem_ids = set()
+    param_finder = ParameterFinder(doc, param_name)
+    skip_id_values = {elem_id.IntegerValue for elem_id in ids_to_skip}
+    past_intersec_id_values = set()
 
     for scope_box in scope_boxes:
         scope_box_report = ScopeBoxReport(scope_box.name)
@@ -685,22 +813,22 @@ def set_param_and_prepare_report(scope_boxes, param_name, ids_to_skip=[]):
             elem_report = ElemetReport(intersec_elem)
 
             try:
-                intersec_elem_id = intersec_elem.id
+                intersec_id_value = intersec_elem.id.IntegerValue
 
-                if intersec_elem_id in ids_to_skip:
+                if intersec_id_value in skip_id_values:
                     raise pke.FailedAttempt(
                         'Changing this parameter is forbidden'
                         ' outside of group edit mode'
                     )
 
-                if intersec_elem_id in past_intersec_elem_ids:
+                if intersec_id_value in past_intersec_id_values:
                     raise pke.FailedAttempt(
                         'Element already intersecting another scope box. '
                         'This scope box name will be skipped.'
                     )
 
-                intersec_elem.set_param_value(param_name, scope_box.name)
-                past_intersec_elem_ids.add(intersec_elem_id)
+                intersec_elem.set_param_value(param_finder, scope_box.name)
+                past_intersec_id_values.add(intersec_id_value)
 
             except Exception as err:
                 elem_report.error_msg = str(err)
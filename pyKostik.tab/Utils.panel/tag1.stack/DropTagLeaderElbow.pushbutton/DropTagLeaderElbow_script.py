@@ -1,9 +1,9 @@
-import inspect
 from pyrevit import revit, script, HOST_APP
 from Autodesk.Revit import DB, UI, Exceptions
 
 doc = revit.doc  # type: DB.Document
 logger = script.get_logger()
+pick_filters = {}  # type: dict[type, PickByClassSelectionFilter]
 
 
 class PickByClassSelectionFilter(UI.Selection.ISelectionFilter):
@@ -28,10 +28,12 @@ class PickByClassSelectionFilter(UI.Selection.ISelectionFilter):
 
 def pick_elements_by_class(obj_type, message=''):
     # type: (type, str) -> list[DB.Element]
-    if not inspect.isclass(obj_type):
+    if not isinstance(obj_type, type):
         raise AttributeError('Object "{}" is not a class'.format(obj_type))
 
-    pick_filter = PickByClassSelectionFilter(obj_type)
+    if obj_type not in pick_filters:
+        pick_filters[obj_type] = PickByClassSelectionFilter(obj_type)
+    pick_filter = pick_filters[obj_type]
 
     try:
         picked_references = HOST_APP.uidoc.Selection.PickObjects(
@@ -51,8 +53,11 @@ selected_tags = pick_elements_by_class(
 )  # type: list[DB.IndependentTag]
 
 if selected_tags:
+    tags_with_leader = [tag for tag in selected_tags if tag.HasLeader]
     with revit.Transaction('Drop Leader Elbow'):
-        for tag in selected_tags:
-            if tag.HasLeader:
-                tag.HasLeader = False
-                tag.HasLeader = True
+        # leaders are removed from all tags first and then restored,
+        # so tags geometry is updated in one go on commit
+        for tag in tags_with_leader:
+            tag.HasLeader = False
+        for tag in tags_with_leader:
+            tag.HasLeader = True
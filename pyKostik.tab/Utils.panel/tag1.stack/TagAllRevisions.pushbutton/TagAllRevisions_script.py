@@ -1,10 +1,15 @@
 import re
-import itertools
-from operator import attrgetter
+import math
+from collections import defaultdict
+from functools import cmp_to_key
 
 from pyrevit import revit, forms, DB, script
 from pykostik import exceptions as pke
 
+# points on arc may be slightly off its outline,
+# especially if the outline is got from tessellation
+APPROX_OUTLINE_TOLERANCE = 0.01
+
 doc = revit.doc  # type: DB.Document
 logger = script.get_logger()
 
@@ -19,12 +24,14 @@ class ViewElementsCollector(object):
         # type: (DB.Document, ViewWrap) -> None
         self._doc = doc
         self._view_id = view_wrap.id
+        self._tagged_revision_cloud_ids = None
 
     def untagged_revision_clouds(self):
         # type: () -> list[DB.RevisionCloud]
+        tagged_revision_cloud_ids = self.tagged_revision_cloud_ids()
         untagged_revision_clouds = []
         for rev_cloud in self.revision_clouds():
-            if rev_cloud.Id not in self.tagged_revision_cloud_ids():
+            if rev_cloud.Id not in tagged_revision_cloud_ids:
                 untagged_revision_clouds.append(rev_cloud)
         return untagged_revision_clouds
 
@@ -37,11 +44,23 @@ class ViewElementsCollector(object):
         )
 
     def tagged_revision_cloud_ids(self):
-        # type: () -> set[DB.ElementId]
-        tagged_revision_ids = set()
+        # type: () -> frozenset[DB.ElementId]
+        if self._tagged_revision_cloud_ids is None:
+            self._tagged_revision_cloud_ids = frozenset().union(
+                *(tag.GetTaggedLocalElementIds()
+                  for tag in self._existing_revision_tags_on_view())
+            )
+        return self._tagged_revision_cloud_ids
+
+    def revision_cloud_tag_wraps(self):
+        # type: () -> dict[int, list[TagWrap]]
+        """Existing tags on view mapped to integer ids of tagged clouds"""
+        cloud_tag_wraps = defaultdict(list)
         for tag in self._existing_revision_tags_on_view():
-            tagged_revision_ids.update(tag.GetTaggedLocalElementIds())
-        return tagged_revision_ids
+            tag_wrap = TagWrap(tag)
+            for cloud_id in tag.GetTaggedLocalElementIds():
+                cloud_tag_wraps[cloud_id.IntegerValue].append(tag_wrap)
+        return cloud_tag_wraps
 
     def _existing_revision_tags_on_view(self):
         # type: () -> list[DB.IndependentTag]
@@ -54,7 +73,12 @@ class ViewElementsCollector(object):
 
 class Sorter(object):
 
+    def __init__(self):
+        # results of comparing names, as same names meet many times
+        self._compared_names = {}  # type: dict[tuple[str, str], int]
+
     def sort_by_attrs(self, iterable, attrs):
+        # type: (Iterable, Iterable[str]) -> Iterable
         return sorted(
             iterable,
             key=self._cmp_to_key_by_attrs(self._names_comparer, attrs)
@@ -76,60 +100,47 @@ class Sorter(object):
             a callable that returns a value for sorting or ordering
         """
 
-        class K(object):
-            __slots__ = ['_obj']
-
-            def __init__(self, obj, attr):
-                self._validate_attr(attr)
-                self._obj = self._resolve_attr(obj, attr)
-
-            def _validate_attr(self, attr):
-                if not isinstance(attr, str):
-                    raise TypeError(
-                        'Expected string, got {}'.format(type(attr)))
-
-            def _resolve_attr(self, obj, attr):
-                for name in attr.split("."):
-                    obj = getattr(obj, name)
-                return obj
-
-            def __lt__(self, other):
-                return comparer(self._obj, other._obj) < 0
-
-            def __gt__(self, other):
-                return comparer(self._obj, other._obj) > 0
-
-            def __eq__(self, other):
-                return comparer(self._obj, other._obj) == 0
-
-            def __le__(self, other):
-                return comparer(self._obj, other._obj) <= 0
-
-            def __ge__(self, other):
-                return comparer(self._obj, other._obj) >= 0
-
-            def __ne__(self, other):
-                return comparer(self._obj, other._obj) != 0
-
-            __hash__ = None
-
         if not hasattr(attrs, '__iter__'):
             raise TypeError('Attributes must be iterable')
 
-        if len(attrs) == 1:
-            def call_k(obj):
-                return K(obj, attrs[0])
-
-        else:
-            def call_k(obj):
-                return tuple(K(obj, attr) for attr in attrs)
+        # attributes are validated and split once per sorting,
+        # not per sorted object
+        for attr in attrs:
+            if not isinstance(attr, str):
+                raise TypeError(
+                    'Expected string, got {}'.format(type(attr)))
+        attr_paths = [attr.split('.') for attr in attrs]
+
+        def resolve_attr(obj, attr_path):
+            for name in attr_path:
+                obj = getattr(obj, name)
+            return obj
+
+        def compare_values(values1, values2):
+            # values are compared one by one until the first difference
+            for value1, value2 in zip(values1, values2):
+                result = comparer(value1, value2)
+                if result:
+                    return result
+            return 0
+
+        to_key = cmp_to_key(compare_values)
+
+        def call_k(obj):
+            return to_key(tuple(resolve_attr(obj, attr_path)
+                                for attr_path in attr_paths))
 
         return call_k
 
     def _names_comparer(self, name1, name2):
         # type: (object, object) -> int
         """Compares two objects as strings using Revit's comparison rules"""
-        return DB.NamingUtils.CompareNames(str(name1), str(name2))
+        names = (str(name1), str(name2))
+        if names not in self._compared_names:
+            result = DB.NamingUtils.CompareNames(*names)
+            self._compared_names[names] = result
+            self._compared_names[names[::-1]] = -result
+        return self._compared_names[names]
 
 
 class RevisionCloudArc(object):
@@ -138,84 +149,180 @@ class RevisionCloudArc(object):
     def __init__(self, arc):
         # type: (DB.Arc) -> None
         self._arc = arc
+        self._approx_outline = None
+        self._max_point = None
+        self._max_xy = None
 
     def contains_point(self, point):
         # type: (DB.XYZ) -> bool
+        if not self.approx_outline.Contains(point, APPROX_OUTLINE_TOLERANCE):
+            return False
+
         projected_point = self._arc.Project(point).XYZPoint
         return projected_point.IsAlmostEqualTo(point)
 
-    @property
-    def approx_outline(self):
+    def _get_approx_outline(self):
         # type: () -> DB.Outline
+        if isinstance(self._arc, DB.Arc) and self._arc.IsBound:
+            return self._get_arc_outline()
+
         arc_tasselation = self._arc.Tessellate()
         tasselated_polyline = DB.PolyLine.Create(arc_tasselation)
         return tasselated_polyline.GetOutline()
 
+    def _get_arc_outline(self):
+        # type: () -> DB.Outline
+        """Outline of the arc computed from its endpoints
+        and its extreme points along each axis, without tessellation.
+        """
+        center = self._arc.Center
+        radius = self._arc.Radius
+        x_dir = self._arc.XDirection
+        y_dir = self._arc.YDirection
+        center_coords = (center.X, center.Y, center.Z)
+        x_dir_coords = (x_dir.X, x_dir.Y, x_dir.Z)
+        y_dir_coords = (y_dir.X, y_dir.Y, y_dir.Z)
+
+        start_param = self._arc.GetEndParameter(0)
+        end_param = self._arc.GetEndParameter(1)
+        params = [start_param, end_param]
+        for x_coord, y_coord in zip(x_dir_coords, y_dir_coords):
+            # coordinate along the axis is extreme where its derivative
+            # -sin(t) * x_coord + cos(t) * y_coord is zero
+            extreme_param = math.atan2(y_coord, x_coord)
+            for param in (extreme_param, extreme_param + math.pi):
+                param = start_param + (param - start_param) % (2 * math.pi)
+                if param < end_param:
+                    params.append(param)
+
+        min_coords = [float('inf')] * 3
+        max_coords = [float('-inf')] * 3
+        for param in params:
+            cos_param = radius * math.cos(param)
+            sin_param = radius * math.sin(param)
+            for i in range(3):
+                coord = (center_coords[i]
+                         + cos_param * x_dir_coords[i]
+                         + sin_param * y_dir_coords[i])
+                min_coords[i] = min(min_coords[i], coord)
+                max_coords[i] = max(max_coords[i], coord)
+
+        return DB.Outline(DB.XYZ(*min_coords), DB.XYZ(*max_coords))
+
+    @property
+    def approx_outline(self):
+        # type: () -> DB.Outline
+        if self._approx_outline is None:
+            self._approx_outline = self._get_approx_outline()
+        return self._approx_outline
+
+    @property
+    def max_point(self):
+        # type: () -> DB.XYZ
+        if self._max_point is None:
+            self._max_point = self.approx_outline.MaximumPoint
+        return self._max_point
+
+    @property
+    def max_xy(self):
+        # type: () -> tuple[float, float]
+        """X and Y of `max_point` to find top right arc by."""
+        if self._max_xy is None:
+            self._max_xy = (self.max_point.X, self.max_point.Y)
+        return self._max_xy
+
     @property
     def reference(self):
         return self._arc.Reference
 
 
+class DisjointSet(object):
+    """Disjoint-set forest of integer indexes
+    with union by size and path halving."""
+
+    def __init__(self, size):
+        # type: (int) -> None
+        self._parent = list(range(size))
+        self._size = [1] * size
+
+    def find(self, index):
+        # type: (int) -> int
+        """Gets root index of the set containing given index."""
+        parent = self._parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, index1, index2):
+        # type: (int, int) -> None
+        """Merges sets containing given indexes."""
+        root1 = self.find(index1)
+        root2 = self.find(index2)
+        if root1 == root2:
+            return
+
+        if self._size[root1] < self._size[root2]:
+            root1, root2 = root2, root1
+
+        self._parent[root2] = root1
+        self._size[root1] += self._size[root2]
+
+
 class CurveGroups(object):
     """Group of curves by connectivity"""
 
     def __init__(self, curves):
         # type: (list[DB.Curve]) -> None
         self._curves = curves
+        self._endpoints_coords = [
+            self._get_endpoints_coords(curve) for curve in curves
+        ]
         self._groups = self._group_by_connectivity()
 
     def _group_by_connectivity(self):
         # type: () -> list[list[DB.Curve]]
         """Groups curves by their connectivity."""
-        curves_dict = {i: v for i, v in enumerate(self._curves)}
-        neighbors = self._get_neighbors(curves_dict)
-        merged = self._merge_touching_sets(neighbors)
-        return [[curves_dict[k] for k in group] for group in merged]
-
-    def _are_curves_connected(self, curve1, curve2):
-        # type: (DB.Curve, DB.Curve) -> bool
-        p11 = curve1.GetEndPoint(0)
-        p12 = curve1.GetEndPoint(1)
-        p21 = curve2.GetEndPoint(0)
-        p22 = curve2.GetEndPoint(1)
-        return any(
-            (p11.IsAlmostEqualTo(p21),
-             p11.IsAlmostEqualTo(p22),
-             p12.IsAlmostEqualTo(p21),
-             p12.IsAlmostEqualTo(p22))
+        # each closed loop takes at least two bound curves,
+        # so fewer than four curves can not make separate loops
+        if len(self._curves) < 4:
+            return [list(self._curves)]
+
+        disjoint_set = DisjointSet(len(self._curves))
+        endpoint_to_curves = self._map_endpoints_to_curves()
+        for curve_indexes in endpoint_to_curves.values():
+            first_index = curve_indexes[0]
+            for other_index in curve_indexes[1:]:
+                disjoint_set.union(first_index, other_index)
+
+        groups = defaultdict(list)
+        for i, curve in enumerate(self._curves):
+            groups[disjoint_set.find(i)].append(curve)
+        return list(groups.values())
+
+    def _map_endpoints_to_curves(self):
+        # type: () -> dict[tuple, list[int]]
+        """Maps approximate coordinates of each endpoint
+            to indexes of the curves sharing it."""
+        endpoint_to_curves = defaultdict(list)
+        for i, (start, end) in enumerate(self._endpoints_coords):
+            endpoint_to_curves[start].append(i)
+            endpoint_to_curves[end].append(i)
+        return endpoint_to_curves
+
+    def _get_endpoints_coords(self, curve):
+        # type: (DB.Curve) -> tuple[tuple[float, float, float], ...]
+        """Approximate coordinates of curve start and end.
+            Read once per curve, as each API call is an interop call."""
+        return (
+            self._approx_coords(curve.GetEndPoint(0)),
+            self._approx_coords(curve.GetEndPoint(1))
         )
 
-    def _get_neighbors(self, curves_dict):
-        # type: (dict) -> list[set[dict.key]]
-        """Gets all neighbors for each curve
-            as list of sets of dictionary keys"""
-        all_neighbours = []
-        for i in curves_dict:
-            sub_neighbours = {i}
-            for j in curves_dict:
-                are_curves_connected = \
-                    self._are_curves_connected(curves_dict[i], curves_dict[j])
-                if j != i and are_curves_connected:
-                    sub_neighbours.add(j)
-            all_neighbours.append(sub_neighbours)
-        return all_neighbours
-
-    def _merge_touching_sets(self, sets):
-        # type: (list[set]) -> list[set]
-        """Merges sets with common elements.
-            Source: https://stackoverflow.com/a/9400562
-        """
-        new_group = []
-        while len(new_group) != len(sets):
-            new_group, sets = sets, []
-            for set1 in new_group:
-                for set2 in sets:
-                    if not set1.isdisjoint(set2):
-                        set2.update(set1)
-                        break
-                else:
-                    sets.append(set1)
-        return sets
+    def _approx_coords(self, point):
+        # type: (DB.XYZ) -> tuple[float, float, float]
+        """Coordinates rounded to the tolerance of `XYZ.IsAlmostEqualTo`"""
+        return (round(point.X, 9), round(point.Y, 9), round(point.Z, 9))
 
     @property
     def groups(self):
@@ -317,6 +424,7 @@ class ViewWrap(object):
         self._view = view
         self._view_type = view.ViewType
         self._doc = view.Document
+        self._family_name = None
 
     def get_geometry_options(self):
         geom_opts = DB.Options()
@@ -333,13 +441,19 @@ class ViewWrap(object):
         # type: () -> str
         return self._view.Name
 
-    @property
-    def is_valid_for_revision_cloud(self):
+    @classmethod
+    def is_view_valid_for_revision_cloud(cls, view):
+        # type: (DB.View) -> bool
+        """Same as `is_valid_for_revision_cloud` without wrapping the view"""
         return (
-            self._view_type in self._VIEW_TYPES_VALID_FOR_REVISION_CLOUD
-            and not self._view.IsTemplate
+            view.ViewType in cls._VIEW_TYPES_VALID_FOR_REVISION_CLOUD
+            and not view.IsTemplate
         )
 
+    @property
+    def is_valid_for_revision_cloud(self):
+        return self.is_view_valid_for_revision_cloud(self._view)
+
     @property
     def view_type(self):
         return self._view_type
@@ -348,8 +462,7 @@ class ViewWrap(object):
     def is_template(self):
         return self._view.IsTemplate
 
-    @property
-    def family_name(self):
+    def _get_family_name(self):
         # type: () -> str
         family_name_param = self._view.get_Parameter(
             DB.BuiltInParameter.VIEW_FAMILY)  # type: DB.Parameter
@@ -359,6 +472,13 @@ class ViewWrap(object):
             'Failed getting Family Name for {}({})'.format(self.name, self.id)
         )
 
+    @property
+    def family_name(self):
+        # type: () -> str
+        if self._family_name is None:
+            self._family_name = self._get_family_name()
+        return self._family_name
+
     @property
     def id(self):
         return self._view.Id
@@ -377,6 +497,7 @@ class ViewSelectionItem(object):
         self._view_name = view_wrap.name
         self._type = view_wrap.view_type
         self._is_template = view_wrap.is_template
+        self._name = None
 
     def _add_spaces_after_capitals(self, txt):
         # type: (str) -> str
@@ -392,9 +513,12 @@ class ViewSelectionItem(object):
 
     @property
     def name(self):
-        if self._type == DB.ViewType.DrawingSheet:
-            return self._name_for_sheet
-        return self._general_name_for_views
+        if self._name is None:
+            if self._type == DB.ViewType.DrawingSheet:
+                self._name = self._name_for_sheet
+            else:
+                self._name = self._general_name_for_views
+        return self._name
 
     @property
     def _name_for_sheet(self):
@@ -417,45 +541,32 @@ class ViewSelectionItem(object):
 class ViewRevisionCloud(object):
     """Wrapper for Revit `RevisionCloud`"""
 
-    def __init__(self, revision_cloud):
-        # type: (DB.RevisionCloud) -> None
+    def __init__(self, revision_cloud, geom_opts):
+        # type: (DB.RevisionCloud, DB.Options) -> None
+        """`geom_opts` are shared by all clouds of the owner view,
+        see `ViewWrap.get_geometry_options`.
+        """
         self._revision_cloud = revision_cloud
-        self._doc = revision_cloud.Document
-        self._view_id = revision_cloud.OwnerViewId
-
-    def existing_tag_wraps(self):
-        # type: () -> list[TagWrap]
-        and_filter = self._bic_rev_tags_filter()
-        tag_wraps = []
-        for id in self._revision_cloud.GetDependentElements(and_filter):
-            tag_wrap = TagWrap(
-                self._doc.GetElement(id)
-            )
-            tag_wraps.append(tag_wrap)
-        return tag_wraps
+        self._geom_opts = geom_opts
+        self._geometric_arcs = None
 
-    def _bic_rev_tags_filter(self):
-        viis_on_view_filter = DB.VisibleInViewFilter(self._doc, self._view_id)
-        bic_rev_tags_filter = DB.ElementCategoryFilter(
-            DB.BuiltInCategory.OST_RevisionCloudTags
-        )
-        return DB.LogicalAndFilter(
-            viis_on_view_filter,
-            bic_rev_tags_filter
-        )
+    def existing_tag_wraps(self, cloud_tag_wraps):
+        # type: (dict[int, list[TagWrap]]) -> list[TagWrap]
+        """Gets tags of this cloud from tags collected for the whole view
+        by `ViewElementsCollector.revision_cloud_tag_wraps`.
+        """
+        return cloud_tag_wraps.get(self.id.IntegerValue, [])
 
     def get_subclouds(self):
-        geometric_arcs = self._get_geometric_arcs()
-        arc_groups = CurveGroups(geometric_arcs).groups
+        arc_groups = CurveGroups(self.geometric_arcs).groups
         return [
             ViewRevisionSubCloud(arcs) for arcs in arc_groups
         ]
 
     def _get_geometric_arcs(self):
         # type: () -> list[DB.Arc]
-        geom_opts = self._get_geometry_options()
         geometric_arcs = []
-        geom_elems = self._revision_cloud.get_Geometry(geom_opts)
+        geom_elems = self._revision_cloud.get_Geometry(self._geom_opts)
         for geom_elem in geom_elems:
             if isinstance(geom_elem, DB.GeometryInstance):
                 geom_objects = geom_elem.GetInstanceGeometry()
@@ -463,11 +574,13 @@ class ViewRevisionCloud(object):
                     geometric_arcs.append(geom_obj)
         return geometric_arcs
 
-    def _get_geometry_options(self):
-        geom_opts = DB.Options()
-        geom_opts.View = self._doc.GetElement(self._revision_cloud.OwnerViewId)
-        geom_opts.ComputeReferences = True
-        return geom_opts
+    @property
+    def geometric_arcs(self):
+        # type: () -> list[DB.Arc]
+        """Arcs with references, extracted once per cloud."""
+        if self._geometric_arcs is None:
+            self._geometric_arcs = self._get_geometric_arcs()
+        return self._geometric_arcs
 
     @property
     def id(self):
@@ -481,23 +594,41 @@ class ViewRevisionSubCloud(object):
     def __init__(self, arcs):
         # type: (DB.Arc) -> None
         self._arcs = [RevisionCloudArc(arc) for arc in arcs]
+        self._approx_outline = None
+
+    def _get_approx_outline(self):
+        # type: () -> DB.Outline
+        first_outline = self._arcs[0].approx_outline
+        outline = DB.Outline(
+            first_outline.MinimumPoint,
+            first_outline.MaximumPoint
+        )
+        for arc in self._arcs[1:]:
+            outline.AddPoint(arc.approx_outline.MinimumPoint)
+            outline.AddPoint(arc.approx_outline.MaximumPoint)
+        return outline
 
     def is_point_on_group(self, point):
         # type: (DB.XYZ) -> bool
+        # cheap outline check first, to project on arcs only when needed
+        if not self.approx_outline.Contains(point, APPROX_OUTLINE_TOLERANCE):
+            return False
+
         for arc in self._arcs:
             if arc.contains_point(point):
                 return True
         return False
 
+    @property
+    def approx_outline(self):
+        # type: () -> DB.Outline
+        if self._approx_outline is None:
+            self._approx_outline = self._get_approx_outline()
+        return self._approx_outline
+
     @property
     def top_right_arc(self):
-        return max(
-            self._arcs,
-            key=attrgetter(
-                'approx_outline.MaximumPoint.X',
-                'approx_outline.MaximumPoint.Y'
-            )
-        )
+        return max(self._arcs, key=lambda arc: arc.max_xy)
 
     @property
     def is_tagged(self):
@@ -530,7 +661,7 @@ class TagWrap(object):
                 top_right_arc.reference,
                 add_leader,
                 DB.TagOrientation.Horizontal,
-                top_right_arc.approx_outline.MaximumPoint
+                top_right_arc.max_point
             )  # type: DB.IndependentTag
 
             tag_bb = view_wrap.element_bounding_box(new_tag)
@@ -599,13 +730,22 @@ class OutputResult(object):
 def mark_tagged_sub_clouds(tag_wraps, sub_clouds):
     # type: (list[TagWrap], list[ViewRevisionSubCloud]) -> None
     """Sets sub-clouds as tagged if any of tags refer to them"""
-    for tag_wrap, sub_cloud in itertools.product(tag_wraps, sub_clouds):
+    untagged = [sub_cloud for sub_cloud in sub_clouds
+                if not sub_cloud.is_tagged]
+    for tag_wrap in tag_wraps:
+        if not untagged:
+            return
+
         tag_wrap.make_leader_attached()
         tag_wrap.make_leader_free()
         tag_leader_ends = tag_wrap.get_leader_ends()
         for end in tag_leader_ends:
-            if sub_cloud.is_point_on_group(end):
-                sub_cloud.is_tagged = True
+            for sub_cloud in untagged:
+                if sub_cloud.is_point_on_group(end):
+                    sub_cloud.is_tagged = True
+                    untagged.remove(sub_cloud)
+                    # sub-clouds do not touch each other
+                    break
 
 
 def get_geometry_instances(elem, geom_options):
@@ -626,7 +766,7 @@ rev_tag_type_id = DB.FilteredElementCollector(doc) \
     .WhereElementIsElementType() \
     .FirstElementId()
 
-if rev_tag_type_id is None:
+if rev_tag_type_id == DB.ElementId.InvalidElementId:
     forms.alert(
         msg='There is no Revision Cloud Tags in this document.\n'
         'Please load it first.',
@@ -642,12 +782,10 @@ all_views = list(
     .WhereElementIsNotElementType()
 )
 
-view_items = []
-for view in all_views:
-    view_wrap = ViewWrap(view)
-    if view_wrap.is_valid_for_revision_cloud:
-        view_item = ViewSelectionItem(view_wrap)
-        view_items.append(view_item)
+view_items = [
+    ViewSelectionItem(ViewWrap(view)) for view in all_views
+    if ViewWrap.is_view_valid_for_revision_cloud(view)
+]
 
 sorted_view_items = Sorter().sort_by_attrs(
     view_items,
@@ -674,12 +812,15 @@ if selected_views:
             view_wrap = view_item.view_wrap
             view_collector = ViewElementsCollector(doc, view_wrap)
             revision_clouds = view_collector.revision_clouds()
+            cloud_tag_wraps = view_collector.revision_cloud_tag_wraps()
+            geom_opts = view_wrap.get_geometry_options()
             clouds = [
-                ViewRevisionCloud(cloud) for cloud in revision_clouds
+                ViewRevisionCloud(cloud, geom_opts)
+                for cloud in revision_clouds
             ]
 
             for cloud in clouds:
-                existing_tags = cloud.existing_tag_wraps()
+                existing_tags = cloud.existing_tag_wraps(cloud_tag_wraps)
                 sub_clouds = cloud.get_subclouds()
                 if existing_tags:
                     if len(sub_clouds) == 1:
@@ -688,28 +829,34 @@ if selected_views:
                         with revit.DryTransaction():
                             mark_tagged_sub_clouds(existing_tags, sub_clouds)
 
+                untagged_sub_clouds = [
+                    sub_cloud for sub_cloud in sub_clouds
+                    if not sub_cloud.is_tagged
+                ]
+                if not untagged_sub_clouds:
+                    continue
+
                 with revit.Transaction():
-                    for sub_cloud in sub_clouds:
-                        if not sub_cloud.is_tagged:
-                            result = OutputResult(
-                                view_name=view_item.name,
-                                view_id=view_wrap.id,
-                                rev_cloud_id=cloud.id
+                    for sub_cloud in untagged_sub_clouds:
+                        result = OutputResult(
+                            view_name=view_item.name,
+                            view_id=view_wrap.id,
+                            rev_cloud_id=cloud.id
+                        )
+                        try:
+                            new_tag_wrap = TagWrap.tag_sub_cloud(
+                                tag_type_id=rev_tag_type_id,
+                                view_wrap=view_wrap,
+                                revision_sub_cloud=sub_cloud
+                            )
+                            success_mark = ':white_heavy_check_mark:'
+                            result.print_result(
+                                symbol=success_mark,
+                                tag_id=new_tag_wrap.id
+                            )
+                        except AttemptFailure as err:
+                            failure_mark = ':cross_mark:'
+                            result.print_result(
+                                symbol=failure_mark,
+                                fail_txt=err
                             )
-                            try:
-                                new_tag_wrap = TagWrap.tag_sub_cloud(
-                                    tag_type_id=rev_tag_type_id,
-                                    view_wrap=view_wrap,
-                                    revision_sub_cloud=sub_cloud
-                                )
-                                success_mark = ':white_heavy_check_mark:'
-                                result.print_result(
-                                    symbol=success_mark,
-                                    tag_id=new_tag_wrap.id
-                                )
-                            except AttemptFailure as err:
-                                failure_mark = ':cross_mark:'
-                                result.print_result(
-                                    symbol=failure_mark,
-                                    fail_txt=err
-                                )
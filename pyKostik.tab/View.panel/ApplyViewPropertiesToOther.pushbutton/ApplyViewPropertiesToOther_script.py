@@ -1,4 +1,6 @@
-from pyrevit import DB, HOST_APP, forms, script
+from pyrevit import DB, HOST_APP, forms, revit, script
+
+TRANSACTION_NAME = 'Apply Visibility Properties to Views'
 
 doc = HOST_APP.doc
 active_view = HOST_APP.active_view
@@ -14,20 +16,35 @@ views = forms.select_views(
 if not views:
     script.exit()
 
-transaction = DB.Transaction(doc, 'Apply Visibility Properties to Views')
-transaction.Start()
-try:
+failed_views = []  # type: list[tuple[DB.View, object]]
+
+# each view has its own transaction,
+# so failing one does not roll back the others
+with revit.TransactionGroup(TRANSACTION_NAME):
     for view in views:
-        view.ApplyViewTemplateParameters(active_view)
-    transaction.Commit()
-except Exception as transaction_err:
-    transaction.RollBack()
+        transaction = DB.Transaction(doc, TRANSACTION_NAME)
+        transaction.Start()
+        try:
+            view.ApplyViewTemplateParameters(active_view)
+            status = transaction.Commit()
+        except Exception as transaction_err:
+            if not transaction.HasEnded():
+                transaction.RollBack()
+            failed_views.append((view, transaction_err))
+        else:
+            # failures processing can roll the transaction back
+            if status != DB.TransactionStatus.Committed:
+                failed_views.append(
+                    (view, 'Transaction status: {}'.format(status)))
+
+if failed_views:
     forms.alert(
         msg=(
-            'Can not apply visibility properties to this view:\n\n'
-            '"{} ({})"\n\n'
-            'Canceling.'
-            .format(view.Name, view.ViewType)
+            'Can not apply visibility properties to these views:\n\n'
+            + '\n'.join(
+                '"{} ({})"'.format(view.Name, view.ViewType)
+                for view, _ in failed_views
+            )
         ),
-        expanded=str(transaction_err)
+        expanded='\n'.join(str(err) for _, err in failed_views)
     )
@@ -5,6 +5,11 @@ from pyrevit import forms
 from pyrevit import script
 from System.Windows.Input import Key
 
+# compiled once instead of on every typed character
+NUMBER_INPUT_PATTERN = re.compile(r'\d*[.-]?\d*$')
+# only complete numbers are accepted on save
+NUMBER_PATTERN = re.compile(r'-?(?:\d+\.?\d*|\.\d+)$')
+
 
 class ElevationCropByBordersConfigWindow(forms.WPFWindow):
     def __init__(self, xaml_file_name):
@@ -33,8 +38,7 @@ class ElevationCropByBordersConfigWindow(forms.WPFWindow):
     def crop_offset_preview(self, sender, t):
         # restrict input to number
         # TODO: restrict using several dots and minus symbols
-        re_pattern = re.compile(r'^\d*[.-]?\d*$')
-        t.Handled = not(re_pattern.match(t.Text))
+        t.Handled = not(NUMBER_INPUT_PATTERN.match(t.Text))
 
     def crop_offset_keydown(self, sender, key_event_arg):
         if key_event_arg.Key == Key.Enter:
@@ -54,12 +58,7 @@ class ElevationCropByBordersConfigWindow(forms.WPFWindow):
         self.set_all(False)
 
     def _is_number(self, input_str):
-        is_number = True
-        try:
-            float(input_str)
-        except ValueError:
-            is_number = False
-        return is_number
+        return bool(NUMBER_PATTERN.match(input_str))
 
     def save_options(self, sender, args):
         # vertical
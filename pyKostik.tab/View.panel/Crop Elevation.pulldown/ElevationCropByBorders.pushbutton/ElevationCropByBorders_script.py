@@ -4,6 +4,11 @@ from pyrevit import DB, forms, revit, script
 from System.Collections.Generic import List
 from System import Type
 
+WALLS_CAT_ID = DB.ElementId(DB.BuiltInCategory.OST_Walls)
+FLOORS_CAT_ID = DB.ElementId(DB.BuiltInCategory.OST_Floors)
+CEILINGS_CAT_ID = DB.ElementId(DB.BuiltInCategory.OST_Ceilings)
+BASIS_Z = DB.XYZ.BasisZ
+
 
 def is_sec_or_elev(view):
     # type: (DB.View) -> bool
@@ -62,80 +67,114 @@ def get_datum_lines(view, datums):
 def curve_loop_to_polyline(curve_loop):
     # type: (DB.CurveLoop) -> DB.PolyLine
     points = List[DB.XYZ]()
-    [points.AddRange(c.Tessellate()) for c in curve_loop]
+    for curve in curve_loop:
+        points.AddRange(curve.Tessellate())
     return DB.PolyLine.Create(points)
 
 
 def get_face_by_normal(solid, face_normal):
     # type: (DB.Solid, DB.XYZ) -> DB.PlanarFace | None
+    normal_x, normal_y, normal_z = face_normal.X, face_normal.Y, face_normal.Z
     for face in solid.Faces:
-        if isinstance(face, DB.PlanarFace)\
-                and face.FaceNormal.IsAlmostEqualTo(face_normal):
+        if not isinstance(face, DB.PlanarFace):
+            continue
+        # both normals are unit vectors, so codirectional
+        # when their dot product is almost 1
+        normal = face.FaceNormal
+        if (normal.X * normal_x
+                + normal.Y * normal_y
+                + normal.Z * normal_z) > 1.0 - 1e-9:
             return face
 
 
+def iter_solids(geometry):
+    # type: (DB.GeometryElement) -> Iterator[DB.Solid]
+    """Yields solids of geometry, including ones of its instances"""
+    for geom_obj in geometry:
+        if isinstance(geom_obj, DB.Solid):
+            yield geom_obj
+        elif isinstance(geom_obj, DB.GeometryInstance):
+            for solid in iter_solids(geom_obj.GetInstanceGeometry()):
+                yield solid
+
+
 def get_elems_edges_by_normal(elements, face_normal, geom_options):
     # type: (list[DB.Element], DB.XYZ, DB.Options) -> list[DB.CurveLoop]
     curve_loops = []
     for elem in elements:
-        geom_elems = elem.get_Geometry(geom_options)
-        for geom_elem in geom_elems:
-            if isinstance(geom_elem, DB.Solid):
-                face = get_face_by_normal(geom_elem, face_normal)
-                if face:
-                    curve_loops.extend(face.GetEdgesAsCurveLoops())
-            elif isinstance(geom_elem, DB.GeometryInstance):
-                geom_objects = geom_elem.GetInstanceGeometry()
-                for geom_obj in geom_objects:
-                    if isinstance(geom_obj, DB.Solid):
-                        face = get_face_by_normal(geom_obj, face_normal)
-                        if face:
-                            curve_loops.extend(face.GetEdgesAsCurveLoops())
+        for solid in iter_solids(elem.get_Geometry(geom_options)):
+            face = get_face_by_normal(solid, face_normal)
+            if face:
+                curve_loops.extend(face.GetEdgesAsCurveLoops())
     return curve_loops
 
 
-def pick_vertical_lines(edges):
-    # type: (list[DB.CurveLoop]) -> list[DB.Line]
-    """Picks lines that parallel to axis Z"""
+def partition_lines(edges):
+    # type: (list[DB.CurveLoop]) -> tuple[list[DB.Line], list[DB.Line]]
+    """Splits lines into parallel and NOT parallel to axis Z"""
     vertical_lines = []
-    for curve_loop in edges:
-        for curve in curve_loop:
-            if isinstance(curve, DB.Line):
-                dot_prod = curve.Direction.DotProduct(DB.XYZ.BasisZ)
-                if round(abs(dot_prod), 6) == 1:
-                    vertical_lines.append(curve)
-    return vertical_lines
-
-
-def pick_non_vertical_lines(edges):
-    # type: (list[DB.CurveLoop]) -> list[DB.Line]
-    """Picks lines that are NOT parallel to axis Z"""
     non_vertical_lines = []
     for curve_loop in edges:
         for curve in curve_loop:
             if isinstance(curve, DB.Line):
-                dot_prod = curve.Direction.DotProduct(DB.XYZ.BasisZ)
-                if round(abs(dot_prod), 6) != 1:
+                # same as dot product with BASIS_Z
+                if abs(abs(curve.Direction.Z) - 1.0) < 1e-6:
+                    vertical_lines.append(curve)
+                else:
                     non_vertical_lines.append(curve)
-    return non_vertical_lines
+    return vertical_lines, non_vertical_lines
 
 
-def closed_loop_by_points(points):
-    # type(list[DB.XYZ]) -> DB.CurveLoop()
+def closed_loop_by_corners(corners):
+    # type: (list[DB.XYZ]) -> DB.CurveLoop
+    """Closed loop through four corners of a rectangle"""
+    short_curve_tolerance = app.ShortCurveTolerance
+    corner_0, corner_1, corner_2, corner_3 = corners
     curve_loop = DB.CurveLoop()
-    for i in range(len(points) - 1):
-        if points[i].DistanceTo(points[i + 1]) > app.ShortCurveTolerance:
-            line = DB.Line.CreateBound(points[i], points[i + 1])
-            curve_loop.Append(line)
-        else:
+    for start, end in ((corner_0, corner_1),
+                       (corner_1, corner_2),
+                       (corner_2, corner_3),
+                       (corner_3, corner_0)):
+        if start.DistanceTo(end) <= short_curve_tolerance:
             forms.alert('Crop border too small', exitscript=True)
-    curve_loop.Append(DB.Line.CreateBound(points[-1], points[0]))
+        curve_loop.Append(DB.Line.CreateBound(start, end))
     return curve_loop
 
 
-def line_end_as_uv(line, plane, end_index):
-    # type: (DB.Line, DB.Plane, int) -> float
-    return plane.Project(line.GetEndPoint(end_index))[0]
+def get_plane_coords(plane):
+    # type: (DB.Plane) -> tuple[tuple[float, float, float], ...]
+    """Coordinates of plane Origin, XVec and YVec"""
+    return tuple(
+        (xyz.X, xyz.Y, xyz.Z)
+        for xyz in (plane.Origin, plane.XVec, plane.YVec)
+    )
+
+
+def point_as_uv_coords(point, plane_coords):
+    # type: (DB.XYZ, tuple[tuple[float, float, float], ...]) -> tuple
+    """Same as `DB.Plane.Project(point)[0]`, but computed in Python
+    from coordinates of the plane given by `get_plane_coords`.
+    """
+    origin, x_vec, y_vec = plane_coords
+    offset = (point.X - origin[0], point.Y - origin[1], point.Z - origin[2])
+    u_coord = sum(o * x for o, x in zip(offset, x_vec))
+    v_coord = sum(o * y for o, y in zip(offset, y_vec))
+    return u_coord, v_coord
+
+
+def closest_to_zero(coords):
+    # type: (list[float]) -> tuple[float, float]
+    """Closest negative and closest non-negative coordinates,
+    found in a single pass."""
+    closest_negative = float('-inf')
+    closest_positive = float('inf')
+    for coord in coords:
+        if coord < 0:
+            if coord > closest_negative:
+                closest_negative = coord
+        elif coord < closest_positive:
+            closest_positive = coord
+    return closest_negative, closest_positive
 
 
 def uv_as_xyz(uv, plane):
@@ -152,20 +191,39 @@ active_view = doc.ActiveView
 my_logger = script.get_logger()
 my_config = script.get_config()
 
-selected_borders = [x for x in ('walls',
+# each option is read from config once
+border_options = dict((x, my_config.get_option(x, False))
+                      for x in ('walls',
                                 'grids',
                                 'ceilings',
                                 'floors',
-                                'levels',)
-                    if my_config.get_option(x, False)]
+                                'levels',))
 
-forms.alert_ifnot(selected_borders,
+forms.alert_ifnot(any(border_options.values()),
                   'No borders selected.\n\n'
                   'Select them in options\n(Shift-Click on button)',
                   exitscript=True)
 
 crop_offset = length_to_internal_units(my_config.get_option('crop_offset', 0))
 
+use_walls = border_options['walls']
+use_grids = border_options['grids']
+use_ceilings = border_options['ceilings']
+use_floors = border_options['floors']
+use_levels = border_options['levels']
+
+# walls, floors, ceilings and their parts are collected in one pass
+border_classes = List[Type]()
+if use_walls:
+    border_classes.Add(DB.Wall)
+if use_ceilings:
+    border_classes.Add(DB.Ceiling)
+if use_floors:
+    border_classes.Add(DB.Floor)
+if border_classes:
+    border_classes.Add(DB.Part)
+    multiclass_filter = DB.ElementMulticlassFilter(border_classes)
+
 selection = revit.get_selection().elements
 selected_views = get_views_if_all_elev_or_sec(selection)
 
@@ -236,52 +294,37 @@ for view in views:
     outline_intersection_filter = DB.BoundingBoxIntersectsFilter(crop_outline)
     solid_intersection_filter = DB.ElementIntersectsSolidFilter(crop_as_solid)
 
-    floor_ceiling_classes = List[Type]()
-
-    if 'ceilings' in selected_borders:
-        floor_ceiling_classes.Add(DB.Ceiling)
-
-    if 'floors' in selected_borders:
-        floor_ceiling_classes.Add(DB.Floor)
-
-    if floor_ceiling_classes:
-        multiclass_filter = DB.ElementMulticlassFilter(floor_ceiling_classes)
-        floors_and_ceilings = DB.FilteredElementCollector(doc, view.Id)\
+    if border_classes:
+        border_elems = DB.FilteredElementCollector(doc, view.Id)\
             .WherePasses(multiclass_filter)\
             .WherePasses(outline_intersection_filter)\
-            .WherePasses(solid_intersection_filter)\
             .ToElements()
     else:
-        floors_and_ceilings = List[DB.Element]()
+        border_elems = []
+
+    walls = []
+    floors_and_ceilings = []
+    for elem in border_elems:
+        if isinstance(elem, DB.Part):
+            # solid_intersection_filter did not work with parts
+            parent_cat_id = elem.OriginalCategoryId
+            if use_walls and parent_cat_id == WALLS_CAT_ID:
+                walls.append(elem)
+            elif use_floors and parent_cat_id == FLOORS_CAT_ID:
+                floors_and_ceilings.append(elem)
+            elif use_ceilings and parent_cat_id == CEILINGS_CAT_ID:
+                floors_and_ceilings.append(elem)
+
+        elif not solid_intersection_filter.PassesFilter(elem):
+            continue
+
+        elif isinstance(elem, DB.Wall):
+            walls.append(elem)
 
-    if 'walls' in selected_borders:
-        walls = DB.FilteredElementCollector(doc, view.Id)\
-            .OfClass(DB.Wall)\
-            .WherePasses(outline_intersection_filter)\
-            .WherePasses(solid_intersection_filter)\
-            .ToElements()
-    else:
-        walls = List[DB.Element]()
-
-    parts = DB.FilteredElementCollector(doc, view.Id)\
-        .OfClass(DB.Part)\
-        .WherePasses(outline_intersection_filter)\
-        .ToElements()
-    # .WherePasses(solid_intersection_filter)  # did not work with parts
-
-    for part in parts:
-        parent_cat_id = part.OriginalCategoryId
-        if parent_cat_id == DB.ElementId(DB.BuiltInCategory.OST_Walls)\
-                and 'walls' in selected_borders:
-            walls.Add(part)
-        if parent_cat_id == DB.ElementId(DB.BuiltInCategory.OST_Floors)\
-                and 'floors' in selected_borders:
-            floors_and_ceilings.Add(part)
-        if parent_cat_id == DB.ElementId(DB.BuiltInCategory.OST_Ceilings)\
-                and 'ceilings' in selected_borders:
-            floors_and_ceilings.Add(part)
-
-    if 'levels' in selected_borders:
+        else:
+            floors_and_ceilings.append(elem)
+
+    if use_levels:
         levels = DB.FilteredElementCollector(doc, view.Id)\
             .OfClass(DB.Level)\
             .ToElements()
@@ -289,7 +332,7 @@ for view in views:
     else:
         level_lines = []
 
-    if 'grids' in selected_borders:
+    if use_grids:
         levels = DB.FilteredElementCollector(doc, view.Id)\
             .OfClass(DB.Grid)\
             .ToElements()
@@ -308,41 +351,49 @@ for view in views:
                                                       view_dir,
                                                       geom_options)
 
-    vertical_lines = pick_vertical_lines(vertical_border_edges)
+    vertical_lines = partition_lines(vertical_border_edges)[0]
     vertical_lines.extend(grid_lines)
 
-    non_vertical_lines = pick_non_vertical_lines(horizontal_border_edges)
+    non_vertical_lines = partition_lines(horizontal_border_edges)[1]
     non_vertical_lines.extend(level_lines)
 
     # redefine the crop plane so its origin is at outline origin
     outline_origin = (crop_outline.MinimumPoint
                       + crop_outline.MaximumPoint) / 2
     crop_shape_normal = view_dir
-    basiz_z = DB.XYZ.BasisZ
     crop_plane = DB.Plane.CreateByOriginAndBasis(
         outline_origin,
-        basiz_z.CrossProduct(view_dir),
-        basiz_z)
+        BASIS_Z.CrossProduct(view_dir),
+        BASIS_Z)
 
     # projecting line ends to crop plane
+    crop_plane_coords = get_plane_coords(crop_plane)
     u_coords = [
-        line_end_as_uv(line, crop_plane, 0).U for line in vertical_lines]
+        point_as_uv_coords(line.GetEndPoint(0), crop_plane_coords)[0]
+        for line in vertical_lines
+    ]
     # floor can be sloped, use its top point
-    v_coords = [max(line_end_as_uv(line, crop_plane, ind).V for ind in (0, 1))
-                for line in non_vertical_lines]
-
-    # add old border maxs and mins
-    old_min_uv = crop_plane.Project(crop_outline.MinimumPoint)[0]
-    old_max_uv = crop_plane.Project(crop_outline.MaximumPoint)[0]
-    for uv in (old_min_uv, old_max_uv):
-        u_coords.append(uv.U)
-        v_coords.append(uv.V)
+    v_coords = []
+    for line in non_vertical_lines:
+        start_v = point_as_uv_coords(line.GetEndPoint(0), crop_plane_coords)[1]
+        end_v = point_as_uv_coords(line.GetEndPoint(1), crop_plane_coords)[1]
+        v_coords.append(start_v if start_v > end_v else end_v)
+
+    # add old border maxs and mins,
+    # crop plane origin is the middle of the outline,
+    # so its min point UV is opposite to max point UV
+    max_u, max_v = point_as_uv_coords(crop_outline.MaximumPoint,
+                                      crop_plane_coords)
+    u_coords.extend((-max_u, max_u))
+    v_coords.extend((-max_v, max_v))
 
     # pick closest border coords to crop origin UV(0, 0))
-    left = max((u for u in u_coords if u < 0)) - crop_offset
-    right = min((u for u in u_coords if u >= 0)) + crop_offset
-    top = min((v for v in v_coords if v >= 0)) + crop_offset
-    bottom = max((v for v in v_coords if v < 0)) - crop_offset
+    left, right = closest_to_zero(u_coords)
+    bottom, top = closest_to_zero(v_coords)
+    left -= crop_offset
+    right += crop_offset
+    top += crop_offset
+    bottom -= crop_offset
 
     crop_corners_uv = [DB.UV(left, bottom),
                        DB.UV(left, top),
@@ -350,7 +401,7 @@ for view in views:
                        DB.UV(right, bottom)]
 
     crop_corners_xyz = [uv_as_xyz(uv, crop_plane) for uv in crop_corners_uv]
-    new_crop = closed_loop_by_points(crop_corners_xyz)
+    new_crop = closed_loop_by_corners(crop_corners_xyz)
 
     with revit.Transaction('Crop View by Borders'):
         shape_manager.SetCropShape(new_crop)
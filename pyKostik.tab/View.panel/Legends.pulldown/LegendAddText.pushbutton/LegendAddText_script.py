@@ -23,8 +23,7 @@ uiapp = revit.HOST_APP.uiapp
 selection = revit.get_selection()
 config = script.get_config()
 
-legcomp_sources = [elem for elem in selection.elements
-                   if LegendComponent.is_of_legcomp_cat(elem)]
+legcomp_sources = LegendComponent.filter_legcomps(selection.elements, doc)
 
 text_note_offset_value = 500 / 304.5
 
@@ -48,17 +47,15 @@ if not legcomp_sources:
         forms.alert('There is no Legend Components in this Project')
 
 common_param_names = set()
-legcomps = []  # type: list[LegendComponent]
+wrapped_types = {}  # type: dict[int, FamilyTypeWrapper]
+legcomps = [LegendComponent(lg, wrapped_types) for lg in legcomp_sources]
 
-if legcomp_sources:
-    for lg in legcomp_sources:
-        legcomp = LegendComponent(lg)
-        legcomps.append(legcomp)
-        param_names = legcomp.wrapped_type.param_names
-        if common_param_names:
-            common_param_names.intersection_update(param_names)
-        else:
-            common_param_names.update(param_names)
+if legcomps:
+    # each distinct type is checked only once
+    param_name_sets = [
+        wrapped_type.param_names for wrapped_type in wrapped_types.values()
+    ]
+    common_param_names = set.intersection(*param_name_sets)
 
 picked_param = None
 if legcomp_sources and common_param_names:
@@ -72,25 +69,30 @@ if legcomp_sources and common_param_names:
     if ask_pick_param:
         picked_param = ask_pick_param[0]
 
-with revit.Transaction('Add Text to Legend Components'):
-    if picked_param:
-        text_note_opts = DB.TextNoteOptions()
-        text_note_opts.TypeId = get_first_text_style().Id
-        text_note_opts.HorizontalAlignment = DB.HorizontalTextAlignment.Center
+if picked_param:
+    # same text note options for all components,
+    # prepared before the transaction is started
+    text_note_opts = DB.TextNoteOptions()
+    text_note_opts.TypeId = get_first_text_style().Id
+    text_note_opts.HorizontalAlignment = DB.HorizontalTextAlignment.Center
+    disable_units = ask_pick_param[1][switch_opt_1]
+
+    with revit.Transaction('Add Text to Legend Components'):
         for legcomp in legcomps:
             param = legcomp.wrapped_type.lookup_wrapped_param(picked_param)
-            if ask_pick_param[1][switch_opt_1]:
+            if disable_units:
                 param_value = param.get_value_as_unitless_string(doc)
             else:
                 param_value = param.get_value_as_string()
 
             if param_value is not None and len(param_value) > 0:
-                legcomp_bottom = legcomp.location \
-                    - DB.XYZ(0, legcomp.height / 2, 0)
+                # text is placed below the component bottom by the offset
+                text_note_location = legcomp.location - DB.XYZ(
+                    0, legcomp.height / 2 + text_note_offset_value, 0)
                 text_note = DB.TextNote.Create(
                     doc,
                     legcomp.owner_view_id,
-                    legcomp_bottom - DB.XYZ(0, text_note_offset_value, 0),
+                    text_note_location,
                     param_value,
                     text_note_opts
                 )
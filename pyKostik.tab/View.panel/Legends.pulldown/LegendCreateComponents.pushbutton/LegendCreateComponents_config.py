@@ -5,6 +5,11 @@ from pyrevit import forms
 from pyrevit import script
 from System.Windows.Input import Key
 
+# compiled once instead of on every typed character
+NUMBER_INPUT_PATTERN = re.compile(r'\d*[.-]?\d*$')
+# only complete numbers are accepted on save
+NUMBER_PATTERN = re.compile(r'-?(?:\d+\.?\d*|\.\d+)$')
+
 
 class DistributionOption:
     def __init__(self, display_text, distribution_opt):
@@ -51,20 +56,14 @@ class ConfigWindow(forms.WPFWindow):
     def gap_btw_components_preview(self, sender, t):
         """Restrict input to number"""
         # TODO: restrict using several dots and minus symbols
-        re_pattern = re.compile(r'^\d*[.-]?\d*$')
-        t.Handled = not(re_pattern.match(t.Text))
+        t.Handled = not(NUMBER_INPUT_PATTERN.match(t.Text))
 
     def gap_btw_components_keydown(self, sender, key_event_arg):
         if key_event_arg.Key == Key.Enter:
             self.save_options(sender, key_event_arg)
 
     def _is_number(self, input_str):
-        is_number = True
-        try:
-            float(input_str)
-        except ValueError:
-            is_number = False
-        return is_number
+        return bool(NUMBER_PATTERN.match(input_str))
 
     def save_options(self, sender, args):
         # replace blank text by zero
@@ -2,110 +2,69 @@
 author: Konstantin (https://github.com/nodatasheet)
 """
 
+from functools import cmp_to_key
 from System import EventHandler
+from System.Collections.Generic import List
 from pyrevit import DB, UI, forms, revit, script
 
+LEGCOMP_CAT_ID = DB.ElementId(DB.BuiltInCategory.OST_LegendComponents)
 
-def length_to_internal_units(length):
-    # type: (float) -> float
-    """Converts Length from document units to Revit's internal units"""
+
+def get_length_ui_unit():
+    # type: () -> DB.DisplayUnitType | DB.ForgeTypeId
+    """Gets Length unit of document units"""
     revit_ver = int(app.VersionNumber)
     doc_units = doc.GetUnits()
     if revit_ver < 2021:
-        ui_unit = doc_units.GetFormatOptions(DB.UnitType.UT_Length)\
+        return doc_units.GetFormatOptions(DB.UnitType.UT_Length)\
             .DisplayUnits
     else:
-        ui_unit = doc_units.GetFormatOptions(DB.SpecTypeId.Length)\
+        return doc_units.GetFormatOptions(DB.SpecTypeId.Length)\
             .GetUnitTypeId()
-    return DB.UnitUtils.ConvertToInternalUnits(length, ui_unit)
 
 
-def cmp_to_key_by_attrs(comparer, attrs):
-    """Converts a comparer into a key= function
-    for multilevel sorting or ordering by supplied attributes.
+def length_to_internal_units(length):
+    # type: (float) -> float
+    """Converts Length from document units to Revit's internal units"""
+    return DB.UnitUtils.ConvertToInternalUnits(length, length_ui_unit)
 
-    Refer to functools.cmp_to_key() and operator.attrgetter().
+
+def sort_by_names(items, get_names):
+    """Sorts items by their names using Revit's comparison rules.
+
+    Names are read once per item and then compared
+    in order of `get_names` result, so API is not queried
+    on every comparison.
 
     Args:
-        comparer: a function that compares two arguments and then returns
-            a negative value for '<', zero for '==', or a positive for '>'
-        attrs (optional): list of attribute strings
+        items: list of objects to sort
+        get_names: a function that returns a tuple of item names
 
     Returns:
-        key function: a callable that returns a value for sorting or ordering
+        list: sorted items
     """
+    names = [tuple(str(name) for name in get_names(item)) for item in items]
 
-    class K(object):
-        __slots__ = ['_obj']
-
-        def __init__(self, obj, attr):
-            self._validate_attr(attr)
-            self._obj = self._resolve_attr(obj, attr)
-
-        def _validate_attr(self, attr):
-            if not isinstance(attr, str):
-                raise TypeError(
-                    'Expected string, got {}'.format(type(attr)))
-
-        def _resolve_attr(self, obj, attr):
-            for name in attr.split("."):
-                obj = getattr(obj, name)
-            return obj
-
-        def __lt__(self, other):
-            return comparer(self._obj, other._obj) < 0
+    def compare_indexes(index1, index2):
+        for name1, name2 in zip(names[index1], names[index2]):
+            result = DB.NamingUtils.CompareNames(name1, name2)
+            if result:
+                return result
+        return 0
 
-        def __gt__(self, other):
-            return comparer(self._obj, other._obj) > 0
-
-        def __eq__(self, other):
-            return comparer(self._obj, other._obj) == 0
-
-        def __le__(self, other):
-            return comparer(self._obj, other._obj) <= 0
-
-        def __ge__(self, other):
-            return comparer(self._obj, other._obj) >= 0
-
-        def __ne__(self, other):
-            return comparer(self._obj, other._obj) != 0
-
-        __hash__ = None
-
-    if not hasattr(attrs, '__iter__'):
-        raise TypeError('Attributes must be iterable')
-
-    if len(attrs) == 1:
-        def call_k(obj):
-            return K(obj, attrs[0])
-
-    else:
-        def call_k(obj):
-            return tuple(K(obj, attr) for attr in attrs)
-
-    return call_k
-
-
-def names_comparer(name1, name2):
-    """Compares two objects as strings using Revit's comparison rules"""
-    return DB.NamingUtils.CompareNames(str(name1), str(name2))
+    sorted_indexes = sorted(range(len(items)), key=cmp_to_key(compare_indexes))
+    return [items[i] for i in sorted_indexes]
 
 
 def sort_types_by_family_and_param(family_types):
     # type: (list[FamilyTypeWrapper]) -> list[FamilyTypeWrapper]
-    return sorted(
-        family_types,
-        key=cmp_to_key_by_attrs(names_comparer,
-                                ['family_name', 'sorting_param_value'])
-    )
+    return sort_by_names(
+        family_types, lambda ft: (ft.family_name, ft.sorting_param_value))
 
 
 def sort_types_by_param(family_types):
     # type: (list[FamilyTypeWrapper]) -> list[FamilyTypeWrapper]
-    return sorted(
-        family_types,
-        key=cmp_to_key_by_attrs(names_comparer, ['sorting_param_value'])
-    )
+    return sort_by_names(family_types, lambda ft: (ft.sorting_param_value,))
 
 
 def on_failure_processing(sender, event_args, failed_ids):
@@ -120,7 +79,9 @@ def on_failure_processing(sender, event_args, failed_ids):
             if DB.BuiltInFailures.LegendFailures.LegendComponentNotVisible ==\
                     failure.GetFailureDefinitionId():
                 not_vis_failures.append(True)
-                failed_ids.extend(failure.GetFailingElementIds())
+                failed_ids.update(
+                    elem_id.IntegerValue
+                    for elem_id in failure.GetFailingElementIds())
             else:
                 not_vis_failures.append(False)
         if all(not_vis_failures):
@@ -133,34 +94,40 @@ def on_failure_processing(sender, event_args, failed_ids):
         raise Exception('Error occurred while processing failures. | %s', fpex)
 
 
+def distribute_legcomps(legcomps, gap, direction, get_size):
+    # type: (list[LegendComponent], float, DB.XYZ, Callable) -> None
+    """Places Legend Components one after another along the direction.
+
+    Each component is measured once, moved previous one
+    is tracked by its new location.
+    """
+    if not legcomps:
+        return
+    prev_location = legcomps[0].location
+    prev_half_size = get_size(legcomps[0]) / 2
+    for i in range(1, len(legcomps)):
+        legcomp = legcomps[i]
+        half_size = get_size(legcomp) / 2
+        offset = prev_half_size + half_size + gap
+        new_location = prev_location + direction * offset
+        legcomp.move(new_location - legcomp.location)
+        prev_location = new_location
+        prev_half_size = half_size
+
+
 def distribute_left_to_right(legcomps, gap):
     # type: (list[LegendComponent], float) -> None
-    for i, legcomp in enumerate(legcomps[1:], 1):
-        offset = legcomps[i-1].width / 2 + legcomp.width / 2 + gap  # noqa
-        translation = legcomps[i-1].location \
-            - legcomp.location \
-            + DB.XYZ(offset, 0, 0)  # noqa
-        legcomp.move(translation)
+    distribute_legcomps(legcomps, gap, DB.XYZ.BasisX, lambda lc: lc.width)
 
 
 def distribute_bottom_to_top(legcomps, gap):
     # type: (list[LegendComponent], float) -> None
-    for i, legcomp in enumerate(legcomps[1:], 1):
-        offset = legcomps[i-1].height / 2 + legcomp.height / 2 + gap  # noqa
-        translation = legcomps[i-1].location \
-            - legcomp.location \
-            + DB.XYZ(0, offset, 0)  # noqa
-        legcomp.move(translation)
+    distribute_legcomps(legcomps, gap, DB.XYZ.BasisY, lambda lc: lc.height)
 
 
 def distribute_top_to_bottom(legcomps, gap):
     # type: (list[LegendComponent], float) -> None
-    for i, legcomp in enumerate(legcomps[1:], 1):
-        offset = legcomps[i-1].height / 2 + legcomp.height / 2 + gap  # noqa
-        translation = legcomps[i-1].location \
-            - legcomp.location \
-            - DB.XYZ(0, offset, 0)  # noqa
-        legcomp.move(translation)
+    distribute_legcomps(legcomps, gap, -DB.XYZ.BasisY, lambda lc: lc.height)
 
 
 def alert_no_components_in_view():
@@ -177,7 +144,6 @@ class FamilyTypeWrapper(object):
         # type: (DB.ElementType) -> None
         self._validate_type(family_type)
         self._family_type = family_type
-        self._wrapped_params = self._wrap_parameters()
 
     def _validate_type(self, elem_type):
         if not isinstance(elem_type, DB.ElementType):
@@ -185,15 +151,12 @@ class FamilyTypeWrapper(object):
                 'Expected <{}>, got <{}>'.format(DB.ElementType.__name__,
                                                  type(elem_type).__name__))
 
-    def _wrap_parameters(self):
-        return [
-            ParameterWrapper(param) for param in self._family_type.Parameters]
-
     def set_sorting_param(self, param_unique_name):
         # type: (str) -> None
-        for param in self._wrapped_params:
-            if param.unique_name == param_unique_name:
-                self._sorting_param = param
+        """Wraps only the parameter matching the name."""
+        for param in self._family_type.Parameters:
+            if ParameterWrapper.make_unique_name(param) == param_unique_name:
+                self._sorting_param = ParameterWrapper(param)
                 break
         else:
             raise AttributeError(
@@ -218,8 +181,24 @@ class FamilyTypeWrapper(object):
 
     @property
     def unique_param_names(self):
-        # type: (None) -> list[str]
-        return [param.unique_name for param in self._wrapped_params]
+        # type: (None) -> Iterator[str]
+        return (ParameterWrapper.make_unique_name(param)
+                for param in self._family_type.Parameters)
+
+    def get_common_param_names(self, param_unique_names):
+        # type: (set[str]) -> set[str]
+        """Gets those of the names which this type's parameters have.
+
+        Stops reading parameters as soon as all the names are found.
+        """
+        common_names = set()
+        for param in self._family_type.Parameters:
+            unique_name = ParameterWrapper.make_unique_name(param)
+            if unique_name in param_unique_names:
+                common_names.add(unique_name)
+                if len(common_names) == len(param_unique_names):
+                    break
+        return common_names
 
     @property
     def sorting_param_value(self):
@@ -287,14 +266,24 @@ class LegendComponent(object):
     """Class for Legend Component."""
     _id = None
     _component_type = None
+    _component_type_param = None
+    _bounding_box = None
 
-    def __init__(self, legcomp):
-        # type: (DB.Element) -> None
-        self._validate_legcomp(legcomp)
+    def __init__(self, legcomp, validate=True):
+        # type: (DB.Element, bool) -> None
+        if validate:
+            self._validate_legcomp(legcomp)
         self._legcomp = legcomp
         self._legend_view = self._get_owner_view(legcomp)
         self._id = self._legcomp.Id
-        self._component_type = self._get_component_type()
+
+    @classmethod
+    def from_trusted(cls, legcomp):
+        # type: (DB.Element) -> LegendComponent
+        """Wraps an element known to be a Legend Component
+        (e.g. just copied from one) without validating it.
+        """
+        return cls(legcomp, validate=False)
 
     def _get_component_type(self):
         return doc.GetElement(self.component_type_param.AsElementId())
@@ -322,8 +311,7 @@ class LegendComponent(object):
 
     def _assure_legcomp(self, legcomp):
         # type: (DB.Element) -> None
-        if legcomp.Category.Id != \
-                DB.ElementId(DB.BuiltInCategory.OST_LegendComponents):
+        if legcomp.Category.Id != LEGCOMP_CAT_ID:
             raise TypeError(
                 'Element Category should be OST_LegendComponents')
 
@@ -334,29 +322,46 @@ class LegendComponent(object):
                 'Expected <{}>, got <{}>'.format(DB.ElementType.__name__,
                                                  type(elem_type).__name__))
 
-    def copy(self, destination_location):
-        """Copies Legend Component to a given location in Legend View."""
-        # type: (DB.XYZ) -> LegendComponent
-        copied_elem_ids = DB.ElementTransformUtils.CopyElement(
-            doc,
-            self._legcomp.Id,
-            self.location - destination_location)
-        if copied_elem_ids:
-            return LegendComponent(doc.GetElement(copied_elem_ids[0]))
-        else:
+    def copy_many(self, destination_location, count):
+        """Copies Legend Component several times.
+
+        The source is copied once by the translation
+        (same as in `ElementTransformUtils.CopyElement`),
+        then copies made so far are copied again in place,
+        so all copies share one location and it takes
+        about log2(count) copy calls instead of count.
+        """
+        # type: (DB.XYZ, int) -> list[LegendComponent]
+        if count < 1:
+            return []
+        copied_elem_ids = list(DB.ElementTransformUtils.CopyElement(
+            doc, self._legcomp.Id, self.location - destination_location))
+        if not copied_elem_ids:
             raise Exception('Could not copy Legend Component')
+        while len(copied_elem_ids) < count:
+            ids_to_copy = copied_elem_ids[:count - len(copied_elem_ids)]
+            new_elem_ids = DB.ElementTransformUtils.CopyElements(
+                doc, List[DB.ElementId](ids_to_copy), DB.XYZ.Zero)
+            if not new_elem_ids:
+                raise Exception('Could not copy Legend Component')
+            copied_elem_ids.extend(new_elem_ids)
+        return [LegendComponent.from_trusted(doc.GetElement(elem_id))
+                for elem_id in copied_elem_ids]
 
     def move(self, translation):
         """Moves Legend Component by translation vector."""
         # type: (DB.XYZ) -> None
         DB.ElementTransformUtils.MoveElement(
             doc, self._legcomp.Id, translation)
+        self._bounding_box = None
 
     @property
     def component_type_param(self):
         # type: () -> DB.Parameter
-        return self._legcomp.get_Parameter(
-            DB.BuiltInParameter.LEGEND_COMPONENT)
+        if self._component_type_param is None:
+            self._component_type_param = self._legcomp.get_Parameter(
+                DB.BuiltInParameter.LEGEND_COMPONENT)
+        return self._component_type_param
 
     @component_type_param.setter
     def component_type_param(self, param_value):
@@ -366,6 +371,11 @@ class LegendComponent(object):
     @property
     def component_type(self):
         # type: () -> DB.ElementType
+        """Read on first access, as copied components
+        usually get a new type right away.
+        """
+        if self._component_type is None:
+            self._component_type = self._get_component_type()
         return self._component_type
 
     @component_type.setter
@@ -374,6 +384,7 @@ class LegendComponent(object):
         self._validate_family_type(family_type)
         self.component_type_param = family_type.Id
         self._component_type = family_type
+        self._bounding_box = None
 
     @property
     def id(self):
@@ -388,22 +399,29 @@ class LegendComponent(object):
     @property
     def location(self):
         # type: () -> DB.XYZ
-        return (self.bounding_box.Max + self.bounding_box.Min) / 2
+        bounding_box = self.bounding_box
+        return (bounding_box.Max + bounding_box.Min) / 2
 
     @property
     def bounding_box(self):
         # type: () -> DB.BoundingBoxXYZ
-        return self._legcomp.get_BoundingBox(self._legend_view)
+        """Cached until component is moved or its type is changed."""
+        if self._bounding_box is None:
+            self._bounding_box = \
+                self._legcomp.get_BoundingBox(self._legend_view)
+        return self._bounding_box
 
     @property
     def height(self):
         # type: () -> float
-        return self.bounding_box.Max.Y - self.bounding_box.Min.Y
+        bounding_box = self.bounding_box
+        return bounding_box.Max.Y - bounding_box.Min.Y
 
     @property
     def width(self):
         # type: () -> float
-        return self.bounding_box.Max.X - self.bounding_box.Min.X
+        bounding_box = self.bounding_box
+        return bounding_box.Max.X - bounding_box.Min.X
 
 
 class ParameterWrapper(object):
@@ -411,6 +429,7 @@ class ParameterWrapper(object):
 
     def __init__(self, parameter):
         self._parameter = parameter
+        self._unique_name = self.make_unique_name(parameter)
 
     def get_param_value_or_empty_str(self):
         # type: (None) -> int | float | str | DB.ElementId
@@ -437,21 +456,20 @@ class ParameterWrapper(object):
     def parameter(self):
         return self._parameter
 
-    @property
-    def unique_name(self):
-        return self._name + ' <' + str(self._id) + '>'
-
-    @property
-    def _name(self):
-        return self._parameter.Definition.Name
+    @staticmethod
+    def make_unique_name(parameter):
+        # type: (DB.Parameter) -> str
+        """Parameter name with its id, as names can repeat."""
+        return parameter.Definition.Name + ' <' + str(parameter.Id) + '>'
 
     @property
-    def _id(self):
-        return self._parameter.Id
+    def unique_name(self):
+        return self._unique_name
 
 
 app = revit.HOST_APP.app
 doc = revit.doc  # type: DB.Document
+length_ui_unit = get_length_ui_unit()
 uidoc = revit.uidoc  # type: UI.Document
 uiapp = revit.HOST_APP.uiapp  # type: UI.UIApplication
 selection = revit.get_selection()
@@ -469,7 +487,7 @@ legend_view = None
 no_common_params = False
 family_type_ids = set()  # type: set[DB.ElementId]
 common_param_names = set()  # type: set[str]
-failed_legcomp_ids = []  # type: list[DB.ElementId]
+failed_legcomp_ids = set()  # type: set[int]
 family_types = []  # type: list[DB.ElementType]
 sorted_family_types = []  # type: list[DB.ElementType]
 
@@ -500,11 +518,13 @@ if picked_elems and ask_for_legend_view:
         if family_type is not None:
             wrapped_family_type = FamilyTypeWrapper(family_type)
             family_types.append(wrapped_family_type)
-            unique_param_names = wrapped_family_type.unique_param_names
-            if common_param_names:
-                common_param_names.intersection_update(unique_param_names)
-            else:
-                common_param_names.update(unique_param_names)
+            if len(family_types) == 1:
+                common_param_names.update(
+                    wrapped_family_type.unique_param_names)
+            elif common_param_names:
+                common_param_names = \
+                    wrapped_family_type.get_common_param_names(
+                        common_param_names)
 
 if common_param_names:
     switch_opt_1 = 'First sort by Family'
@@ -522,7 +542,8 @@ Place Legend Components without Sorting?',
         cancel=True)
 
 if sorting_param:
-    [ft.set_sorting_param(sorting_param) for ft in family_types]
+    for ft in family_types:
+        ft.set_sorting_param(sorting_param)
 
     if ask_for_sorting_param[1][switch_opt_1]:
         sorted_family_types = sort_types_by_family_and_param(family_types)
@@ -531,50 +552,51 @@ if sorting_param:
 
 if sorted_family_types or no_common_params:
 
-    app.FailuresProcessing += \
-        EventHandler[DB.Events.FailuresProcessingEventArgs](
-            lambda sender, args: on_failure_processing(
-                sender, args, failed_legcomp_ids))
-
-    with revit.TransactionGroup('Create Legend Components'):
-        with revit.Transaction('Create Legend Components'):
-            legcomps = []  # type: list[LegendComponent]
-            for ft in sorted_family_types:
-                legcomp = source_legcomp.copy(DB.XYZ.Zero)
-                legcomp.component_type = ft.family_type
-                legcomps.append(legcomp)
-
-        with revit.Transaction('Distribute Legend Components'):
-            succseed_legcomps = [
-                lg for lg in legcomps if lg.id not in failed_legcomp_ids]
-
-            if legcomps_distribution == 'left_to_right':
-                distribute_left_to_right(succseed_legcomps, gap_btw_components)
-            elif legcomps_distribution == 'top_to_bottom':
-                distribute_top_to_bottom(succseed_legcomps, gap_btw_components)
-            elif legcomps_distribution == 'bottom_to_top':
-                distribute_bottom_to_top(succseed_legcomps, gap_btw_components)
-
-        app.FailuresProcessing -= \
-            EventHandler[DB.Events.FailuresProcessingEventArgs](
-                lambda sender, args: on_failure_processing(
-                    sender, args, failed_legcomp_ids))
+    # same delegate instance is needed to unsubscribe
+    failures_handler = EventHandler[DB.Events.FailuresProcessingEventArgs](
+        lambda sender, args: on_failure_processing(
+            sender, args, failed_legcomp_ids))
+    app.FailuresProcessing += failures_handler
+
+    try:
+        with revit.TransactionGroup('Create Legend Components'):
+            with revit.Transaction('Create Legend Components'):
+                legcomps = source_legcomp.copy_many(
+                    DB.XYZ.Zero, len(sorted_family_types))
+                for legcomp, ft in zip(legcomps, sorted_family_types):
+                    legcomp.component_type = ft.family_type
+
+            with revit.Transaction('Distribute Legend Components'):
+                succseed_legcomps = [
+                    lg for lg in legcomps
+                    if lg.id.IntegerValue not in failed_legcomp_ids]
+
+                if legcomps_distribution == 'left_to_right':
+                    distribute_left_to_right(succseed_legcomps,
+                                             gap_btw_components)
+                elif legcomps_distribution == 'top_to_bottom':
+                    distribute_top_to_bottom(succseed_legcomps,
+                                             gap_btw_components)
+                elif legcomps_distribution == 'bottom_to_top':
+                    distribute_bottom_to_top(succseed_legcomps,
+                                             gap_btw_components)
+    finally:
+        app.FailuresProcessing -= failures_handler
 
     legend_view.request_view_activation()
     legend_view.zoom_to_fit()
 
 if failed_legcomp_ids:
-    failed_types = []
+    # names are read once and used for both sorting and printing
+    failed_type_names = []  # type: list[tuple[str, str]]
     for lg in legcomps:
-        if lg.id in failed_legcomp_ids:
-            failed_types.append(FamilyTypeWrapper(lg.component_type))
+        if lg.id.IntegerValue in failed_legcomp_ids:
+            failed_type_names.append((lg.component_type.FamilyName,
+                                      lg.component_type_name))
 
-    failed_types.sort(
-        key=cmp_to_key_by_attrs(names_comparer, ['family_name', 'type_name'])
-    )
+    failed_type_names = sort_by_names(failed_type_names, lambda names: names)
 
     output = script.get_output()
     output.print_md('###Failed creating Legend Component for:')
-    for failed_type in failed_types:
-        output.print_md('- {}: {}'.format(failed_type.family_name,
-                                          failed_type.type_name))
+    for family_name, type_name in failed_type_names:
+        output.print_md('- {}: {}'.format(family_name, type_name))
@@ -1,5 +1,18 @@
+from functools import cmp_to_key
+
+from System.Collections.Generic import List
 from pyrevit import DB, UI, forms, revit, script, HOST_APP
 
+# units API changed in Revit 2021
+USE_FORGE_TYPE_ID = int(HOST_APP.version) >= 2021
+if USE_FORGE_TYPE_ID:
+    LENGTH_UNIT_TYPE = DB.SpecTypeId.Length
+else:
+    LENGTH_UNIT_TYPE = DB.UnitType.UT_Length
+
+LEGCOMP_CAT_ID = DB.ElementId(DB.BuiltInCategory.OST_LegendComponents)
+INVALID_ELEMENT_ID = DB.ElementId.InvalidElementId
+
 
 class InvalidOperationException(Exception):
     """Invalid Operation Exception"""
@@ -30,16 +43,33 @@ class LegendComponent(object):
     """Class for Legend Component."""
     _id = None
     _component_type = None
-
-    def __init__(self, legcomp):
-        # type: (DB.Element) -> None
+    _bounding_box = None
+    _bounding_box_coords = None
+
+    def __init__(self, legcomp, wrapped_types=None):
+        # type: (DB.Element, dict[int, FamilyTypeWrapper]) -> None
+        """`wrapped_types` can be shared between components,
+        so components of the same type reuse its wrapper
+        instead of wrapping all its parameters again.
+        """
         self._validate_legcomp(legcomp)
         self._doc = legcomp.Document
         self._legcomp = legcomp
         self._legend_view = self._get_owner_view(legcomp)
         self._id = self._legcomp.Id
         self._component_type = self._get_component_type()
-        self._wrapped_type = FamilyTypeWrapper(self._component_type)
+        self._wrapped_type = self._get_wrapped_type(wrapped_types)
+
+    def _get_wrapped_type(self, wrapped_types):
+        # type: (dict[int, FamilyTypeWrapper] | None) -> FamilyTypeWrapper
+        if wrapped_types is None:
+            return FamilyTypeWrapper(self._component_type)
+
+        type_id_value = self._component_type.Id.IntegerValue
+        if type_id_value not in wrapped_types:
+            wrapped_types[type_id_value] = \
+                FamilyTypeWrapper(self._component_type)
+        return wrapped_types[type_id_value]
 
     def _get_component_type(self):
         return self._doc.GetElement(self.component_type_param.AsElementId())
@@ -71,8 +101,7 @@ class LegendComponent(object):
     @classmethod
     def _assure_legcomp(cls, legcomp):
         # type: (DB.Element) -> None
-        if legcomp.Category.Id != \
-                DB.ElementId(DB.BuiltInCategory.OST_LegendComponents):
+        if legcomp.Category.Id != LEGCOMP_CAT_ID:
             raise CategoryValidationError(
                 'Element Category should be OST_LegendComponents')
 
@@ -88,11 +117,29 @@ class LegendComponent(object):
         # type: (DB.Element) -> bool
         """Checks whether Element is of BuiltInCategory.OST_LegendComponents.
         """
-        try:
-            cls._validate_legcomp(elem)
-            return True
-        except ValidationError:
+        if not isinstance(elem, DB.Element):
             return False
+        category = elem.Category
+        return category is not None \
+            and category.Id == LEGCOMP_CAT_ID
+
+    @classmethod
+    def filter_legcomps(cls, elements, _doc):
+        # type: (list[DB.Element], DB.Document) -> list[DB.Element]
+        """Gets Legend Components from elements.
+
+        Filters them by category inside Revit
+        instead of checking elements one by one.
+        """
+        if not elements:
+            return []
+        elem_ids = List[DB.ElementId]([elem.Id for elem in elements])
+        return list(
+            DB.FilteredElementCollector(_doc, elem_ids)
+            .OfCategory(DB.BuiltInCategory.OST_LegendComponents)
+            .WhereElementIsNotElementType()
+            .ToElements()
+        )
 
     @classmethod
     def get_legcomp_cat(cls, _doc):
@@ -125,6 +172,12 @@ class LegendComponent(object):
         # type: (DB.XYZ) -> None
         DB.ElementTransformUtils.MoveElement(
             self._doc, self._legcomp.Id, translation)
+        self.invalidate_bounding_box()
+
+    def invalidate_bounding_box(self):
+        """Makes Bounding Box to be read again on next access."""
+        self._bounding_box = None
+        self._bounding_box_coords = None
 
     @property
     def component_type_param(self):
@@ -160,22 +213,41 @@ class LegendComponent(object):
     @property
     def location(self):
         # type: () -> DB.XYZ
-        return (self.bounding_box.Max + self.bounding_box.Min) / 2
+        min_coords, max_coords = self._get_bounding_box_coords()
+        return DB.XYZ((min_coords[0] + max_coords[0]) / 2,
+                      (min_coords[1] + max_coords[1]) / 2,
+                      (min_coords[2] + max_coords[2]) / 2)
 
     @property
     def bounding_box(self):
         # type: () -> DB.BoundingBoxXYZ
-        return self._legcomp.get_BoundingBox(self._legend_view)
+        """Cached until component is moved."""
+        if self._bounding_box is None:
+            self._bounding_box = \
+                self._legcomp.get_BoundingBox(self._legend_view)
+        return self._bounding_box
+
+    def _get_bounding_box_coords(self):
+        # type: () -> tuple[tuple[float, float, float], ...]
+        if self._bounding_box_coords is None:
+            bounding_box = self.bounding_box
+            self._bounding_box_coords = tuple(
+                (xyz.X, xyz.Y, xyz.Z)
+                for xyz in (bounding_box.Min, bounding_box.Max)
+            )
+        return self._bounding_box_coords
 
     @property
     def height(self):
         # type: () -> float
-        return self.bounding_box.Max.Y - self.bounding_box.Min.Y
+        min_coords, max_coords = self._get_bounding_box_coords()
+        return max_coords[1] - min_coords[1]
 
     @property
     def width(self):
         # type: () -> float
-        return self.bounding_box.Max.X - self.bounding_box.Min.X
+        min_coords, max_coords = self._get_bounding_box_coords()
+        return max_coords[0] - min_coords[0]
 
     @property
     def owner_view_id(self):
@@ -191,7 +263,11 @@ class FamilyTypeWrapper(object):
         # type: (DB.ElementType) -> None
         self._validate_type(family_type)
         self._family_type = family_type
-        self._wrapped_params = self._wrap_parameters()
+        # parameters are wrapped on first use,
+        # as legend components often need only type name
+        self._wrapped_params = None
+        self._params_by_name = None
+        self._params_by_unique_name = None
 
     def _validate_type(self, elem_type):
         if not isinstance(elem_type, DB.ElementType):
@@ -199,16 +275,37 @@ class FamilyTypeWrapper(object):
                 'Expected <{}>, got <{}>'.format(DB.ElementType.__name__,
                                                  type(elem_type).__name__))
 
-    def _wrap_parameters(self):
-        return [
-            ParameterWrapper(param) for param in self._family_type.Parameters]
+    def _get_wrapped_params(self):
+        # type: () -> list[ParameterWrapper]
+        if self._wrapped_params is None:
+            self._wrapped_params = [
+                ParameterWrapper(param)
+                for param in self._family_type.Parameters]
+        return self._wrapped_params
+
+    def _get_params_by_name(self):
+        # type: () -> dict[str, ParameterWrapper]
+        if self._params_by_name is None:
+            self._params_by_name = {}
+            for param in self._get_wrapped_params():
+                # first encountered parameter wins
+                if param.name not in self._params_by_name:
+                    self._params_by_name[param.name] = param
+        return self._params_by_name
+
+    def _get_params_by_unique_name(self):
+        # type: () -> dict[str, ParameterWrapper]
+        if self._params_by_unique_name is None:
+            self._params_by_unique_name = dict(
+                (param.unique_name, param)
+                for param in self._get_wrapped_params())
+        return self._params_by_unique_name
 
     def set_sorting_param(self, param_unique_name):
         # type: (str) -> None
-        for param in self._wrapped_params:
-            if param.unique_name == param_unique_name:
-                self._sorting_param = param
-                break
+        param = self._get_params_by_unique_name().get(param_unique_name)
+        if param is not None:
+            self._sorting_param = param
         else:
             raise InvalidOperationException(
                 'Failed setting sorting parameter:'
@@ -228,9 +325,7 @@ class FamilyTypeWrapper(object):
 
     def lookup_wrapped_param(self, param_name):
         # type: (str) -> ParameterWrapper
-        rvt_param = self._family_type.LookupParameter(param_name)
-        if rvt_param is not None:
-            return ParameterWrapper(rvt_param)
+        return self._get_params_by_name().get(param_name)
 
     @property
     def type_name(self):
@@ -252,13 +347,13 @@ class FamilyTypeWrapper(object):
     def unique_param_names(self):
         # type: (None) -> list[str]
         """A list of unique Parameter Names for this Family Type"""
-        return [param.unique_name for param in self._wrapped_params]
+        return [param.unique_name for param in self._get_wrapped_params()]
 
     @property
     def param_names(self):
         # type: (None) -> set[str]
         """A set of Parameter Names for this Family Type"""
-        return set(param.name for param in self._wrapped_params)
+        return set(self._get_params_by_name())
 
     @property
     def sorting_param_value(self):
@@ -269,11 +364,21 @@ class FamilyTypeWrapper(object):
 
 class ParameterWrapper(object):
     """Class for Revit Parameter"""
+    VALUE_GETTERS = {
+        DB.StorageType.Integer: DB.Parameter.AsInteger,
+        DB.StorageType.Double: DB.Parameter.AsDouble,
+        DB.StorageType.String: DB.Parameter.AsString,
+        DB.StorageType.ElementId: DB.Parameter.AsElementId,
+    }
+    _spec_type_value = None
 
     def __init__(self, parameter):
         # type: (DB.Parameter) -> None
         self._validate_param(parameter)
         self._parameter = parameter
+        self._storage_type_value = parameter.StorageType
+        self._is_element_id = \
+            self._storage_type_value == DB.StorageType.ElementId
 
     def _validate_param(self, param):
         if not isinstance(param, DB.Parameter):
@@ -290,14 +395,10 @@ class ParameterWrapper(object):
 
     def _get_value(self):
         # type: () -> int | float | str | DB.ElementId | None
-        if self._storage_type == DB.StorageType.Integer:
-            return self._parameter.AsInteger()
-        if self._storage_type == DB.StorageType.Double:
-            return self._parameter.AsDouble()
-        if self._storage_type == DB.StorageType.String:
-            return self._parameter.AsString()
-        if self._value_is_element_id and not self._value_is_invalid_element_id:
-            return self._parameter.AsElementId()
+        value_getter = self.VALUE_GETTERS.get(self._storage_type)
+        if value_getter is not None \
+                and not self._value_is_invalid_element_id:
+            return value_getter(self._parameter)
 
     def get_value_as_string(self):
         # type: () -> str
@@ -326,18 +427,20 @@ class ParameterWrapper(object):
     @property
     def _value_is_element_id(self):
         # type: () -> bool
-        return self._storage_type == DB.StorageType.ElementId
+        return self._is_element_id
 
     @property
     def _value_is_invalid_element_id(self):
         # type: () -> bool
         return self._value_is_element_id \
-            and self._parameter.AsElementId() == DB.ElementId.InvalidElementId
+            and self._parameter.AsElementId() == INVALID_ELEMENT_ID
 
     @property
     def _spec_type(self):
         # type: () -> DB.SpecTypeId
-        return self._parameter.Definition.GetDataType()
+        if self._spec_type_value is None:
+            self._spec_type_value = self._parameter.Definition.GetDataType()
+        return self._spec_type_value
 
     @property
     def _unit_type(self):
@@ -348,7 +451,7 @@ class ParameterWrapper(object):
     @property
     def _storage_type(self):
         # type: () -> DB.StorageType
-        return self._parameter.StorageType
+        return self._storage_type_value
 
     @property
     def parameter(self):
@@ -376,67 +479,70 @@ class RevitUnitUtils(object):
         self._doc = doc
         self._doc_units = self._doc.GetUnits()
         self._revit_ver = int(HOST_APP.version)
+        self._format_options = {}  # type: dict[object, DB.FormatOptions]
+        self._ui_units = {}  # type: dict[object, object]
+
+    def _get_format_options(self, unit_type):
+        # type: (DB.UnitType | DB.ForgeTypeId) -> DB.FormatOptions
+        if unit_type not in self._format_options:
+            self._format_options[unit_type] = \
+                self._doc_units.GetFormatOptions(unit_type)
+        return self._format_options[unit_type]
+
+    def _get_ui_unit(self, unit_type):
+        # type: (DB.UnitType | DB.ForgeTypeId) -> object
+        if unit_type not in self._ui_units:
+            format_options = self._get_format_options(unit_type)
+            if self._revit_ver < 2021:
+                self._ui_units[unit_type] = format_options.DisplayUnits
+            else:
+                self._ui_units[unit_type] = format_options.GetUnitTypeId()
+        return self._ui_units[unit_type]
 
     def to_internal_units(self, value, unit_type):
         # type: (float, DB.UnitType | DB.ForgeTypeId) -> float
-        if self._revit_ver < 2021:
-            ui_unit = self._doc_units.GetFormatOptions(unit_type)\
-                .DisplayUnits
-        else:
-            ui_unit = self._doc_units.GetFormatOptions(unit_type)\
-                .GetUnitTypeId()
-        return DB.UnitUtils.ConvertFromInternalUnits(value, ui_unit)
+        return DB.UnitUtils.ConvertFromInternalUnits(
+            value, self._get_ui_unit(unit_type))
 
     def get_unit_accuracy(self, unit_type):
         # type: (DB.UnitType | DB.ForgeTypeId) -> float
         """Accuracy of the given unit in Document."""
         # TODO: Handle fractional units
-        return self._doc_units.GetFormatOptions(unit_type).Accuracy
+        return self._get_format_options(unit_type).Accuracy
 
     def _get_ndigits(self, accuracy):
         # type: (float) -> int
         return str(int(1 / accuracy)).count('0')
 
 
+def get_length_ui_unit(_doc):
+    # type: (DB.Document) -> DB.DisplayUnitType | DB.ForgeTypeId
+    """Gets Length unit of given Document units."""
+    format_options = _doc.GetUnits().GetFormatOptions(LENGTH_UNIT_TYPE)
+    if USE_FORGE_TYPE_ID:
+        return format_options.GetUnitTypeId()
+    return format_options.DisplayUnits
+
+
 def length_to_internal_units(_doc, length):
     # type: (DB.Document, float) -> float
     """Converts Length from document units to Revit's internal units."""
-    revit_ver = int(HOST_APP.version)
-    doc_units = _doc.GetUnits()
-    if revit_ver < 2021:
-        ui_unit = doc_units.GetFormatOptions(DB.UnitType.UT_Length)\
-            .DisplayUnits
-    else:
-        ui_unit = doc_units.GetFormatOptions(DB.SpecTypeId.Length)\
-            .GetUnitTypeId()
-    return DB.UnitUtils.ConvertToInternalUnits(length, ui_unit)
+    return DB.UnitUtils.ConvertToInternalUnits(length,
+                                               get_length_ui_unit(_doc))
 
 
 def length_from_internal_units(_doc, length):
     # type: (DB.Document, float) -> float
     """Converts Length from Revit's internal units to document units."""
-    revit_ver = int(HOST_APP.version)
-    doc_units = _doc.GetUnits()
-    if revit_ver < 2021:
-        ui_unit = doc_units.GetFormatOptions(DB.UnitType.UT_Length)\
-            .DisplayUnits
-    else:
-        ui_unit = doc_units.GetFormatOptions(DB.SpecTypeId.Length)\
-            .GetUnitTypeId()
-    return DB.UnitUtils.ConvertFromInternalUnits(length, ui_unit)
+    return DB.UnitUtils.ConvertFromInternalUnits(length,
+                                                 get_length_ui_unit(_doc))
 
 
 def get_length_accuracy(_doc):
     # type: (DB.Document) -> float
     """Gets Accuracy of the Length in given Document."""
     # TODO: Handle fractional units
-    revit_ver = int(HOST_APP.version)
-    doc_units = _doc.GetUnits()
-    if revit_ver < 2021:
-        unit_type = DB.UnitType.UT_Length
-    else:
-        unit_type = DB.SpecTypeId.Length
-    return doc_units.GetFormatOptions(unit_type).Accuracy
+    return _doc.GetUnits().GetFormatOptions(LENGTH_UNIT_TYPE).Accuracy
 
 
 def cmp_to_key_by_attrs(comparer, attrs):
@@ -454,53 +560,47 @@ def cmp_to_key_by_attrs(comparer, attrs):
         key function: a callable that returns a value for sorting or ordering
     """
 
-    class K(object):
-        __slots__ = ['_obj']
-
-        def __init__(self, obj, attr):
-            self._validate_attr(attr)
-            self._obj = self._resolve_attr(obj, attr)
-
-        def _validate_attr(self, attr):
-            if not isinstance(attr, str):
-                raise TypeError(
-                    'Expected string, got {}'.format(type(attr)))
-
-        def _resolve_attr(self, obj, attr):
-            for name in attr.split("."):
-                obj = getattr(obj, name)
-            return obj
-
-        def __lt__(self, other):
-            return comparer(self._obj, other._obj) < 0
-
-        def __gt__(self, other):
-            return comparer(self._obj, other._obj) > 0
-
-        def __eq__(self, other):
-            return comparer(self._obj, other._obj) == 0
-
-        def __le__(self, other):
-            return comparer(self._obj, other._obj) <= 0
-
-        def __ge__(self, other):
-            return comparer(self._obj, other._obj) >= 0
-
-        def __ne__(self, other):
-            return comparer(self._obj, other._obj) != 0
-
-        __hash__ = None
-
     if not hasattr(attrs, '__iter__'):
         raise TypeError('Attributes must be iterable')
 
-    if len(attrs) == 1:
-        def call_k(obj):
-            return K(obj, attrs[0])
-
-    else:
-        def call_k(obj):
-            return tuple(K(obj, attr) for attr in attrs)
+    # attributes are validated and split once per sorting,
+    # not per sorted object
+    for attr in attrs:
+        if not isinstance(attr, str):
+            raise TypeError(
+                'Expected string, got {}'.format(type(attr)))
+    attr_paths = [attr.split('.') for attr in attrs]
+
+    # results of comparing values, as same values meet many times,
+    # kept only for the sorting this key function is made for
+    compared_values = {}  # type: dict[tuple, int]
+
+    def resolve_attr(obj, attr_path):
+        for name in attr_path:
+            obj = getattr(obj, name)
+        return obj
+
+    def compare_value(value1, value2):
+        values = (value1, value2)
+        if values not in compared_values:
+            result = comparer(value1, value2)
+            compared_values[values] = result
+            compared_values[(value2, value1)] = -result
+        return compared_values[values]
+
+    def compare_values(values1, values2):
+        # values are compared one by one until the first difference
+        for value1, value2 in zip(values1, values2):
+            result = compare_value(value1, value2)
+            if result:
+                return result
+        return 0
+
+    to_key = cmp_to_key(compare_values)
+
+    def call_k(obj):
+        return to_key(tuple(resolve_attr(obj, attr_path)
+                            for attr_path in attr_paths))
 
     return call_k
 
@@ -1,6 +1,7 @@
 import re
 import itertools
 from abc import ABCMeta
+from functools import cmp_to_key
 from operator import attrgetter
 
 from pyrevit import DB, revit, script, forms
@@ -26,6 +27,10 @@ class UnexpectedAttemptFailure(Exception):
 
 class Sorter(object):
 
+    def __init__(self):
+        # results of comparing names, as same names meet many times
+        self._compared_names = {}  # type: dict[tuple[str, str], int]
+
     def sort_by_attrs(self, iterable, attrs):
         # type: (Iterable, Iterable[str]) -> Iterable
         return sorted(
@@ -49,60 +54,47 @@ class Sorter(object):
             a callable that returns a value for sorting or ordering
         """
 
-        class K(object):
-            __slots__ = ['_obj']
-
-            def __init__(self, obj, attr):
-                self._validate_attr(attr)
-                self._obj = self._resolve_attr(obj, attr)
-
-            def _validate_attr(self, attr):
-                if not isinstance(attr, str):
-                    raise TypeError(
-                        'Expected string, got {}'.format(type(attr)))
-
-            def _resolve_attr(self, obj, attr):
-                for name in attr.split("."):
-                    obj = getattr(obj, name)
-                return obj
-
-            def __lt__(self, other):
-                return comparer(self._obj, other._obj) < 0
-
-            def __gt__(self, other):
-                return comparer(self._obj, other._obj) > 0
-
-            def __eq__(self, other):
-                return comparer(self._obj, other._obj) == 0
-
-            def __le__(self, other):
-                return comparer(self._obj, other._obj) <= 0
-
-            def __ge__(self, other):
-                return comparer(self._obj, other._obj) >= 0
-
-            def __ne__(self, other):
-                return comparer(self._obj, other._obj) != 0
-
-            __hash__ = None
-
         if not hasattr(attrs, '__iter__'):
             raise TypeError('Attributes must be iterable')
 
-        if len(attrs) == 1:
-            def call_k(obj):
-                return K(obj, attrs[0])
-
-        else:
-            def call_k(obj):
-                return tuple(K(obj, attr) for attr in attrs)
+        # attributes are validated and split once per sorting,
+        # not per sorted object
+        for attr in attrs:
+            if not isinstance(attr, str):
+                raise TypeError(
+                    'Expected string, got {}'.format(type(attr)))
+        attr_paths = [attr.split('.') for attr in attrs]
+
+        def resolve_attr(obj, attr_path):
+            for name in attr_path:
+                obj = getattr(obj, name)
+            return obj
+
+        def compare_values(values1, values2):
+            # values are compared one by one until the first difference
+            for value1, value2 in zip(values1, values2):
+                result = comparer(value1, value2)
+                if result:
+                    return result
+            return 0
+
+        to_key = cmp_to_key(compare_values)
+
+        def call_k(obj):
+            return to_key(tuple(resolve_attr(obj, attr_path)
+                                for attr_path in attr_paths))
 
         return call_k
 
     def _names_comparer(self, name1, name2):
         # type: (object, object) -> int
         """Compares two objects as strings using Revit's comparison rules"""
-        return DB.NamingUtils.CompareNames(str(name1), str(name2))
+        names = (str(name1), str(name2))
+        if names not in self._compared_names:
+            result = DB.NamingUtils.CompareNames(*names)
+            self._compared_names[names] = result
+            self._compared_names[names[::-1]] = -result
+        return self._compared_names[names]
 
 
 class BaseCategoryWrap(object):